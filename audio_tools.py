@@ -0,0 +1,136 @@
+"""
+Audio features of the sessions, from the .wav written by extract-audio.py,
+on the time grid of the sensor data (sensor_tools.resample_streams), so
+they can join the sensor columns in event criteria and baselines.
+
+The WAV is memory mapped and processed block by block, so only one block
+of samples is in memory however long the session is.
+
+    sigs_X_df = st.resample_streams(st.load_session(session_dir), f_s=10)
+    t0 = audio_start(st.load_events(session_dir))
+    audio_df = audio_features(session_audio(session_dir), t0, f_s=10,
+                              t_start=sigs_X_df.attrs["t0_epoch_s"], n=len(sigs_X_df))
+    sigs_X_df = sigs_X_df.join(audio_df.drop(columns="time_s"))
+"""
+import glob
+import numpy as np
+import pandas as pd
+from scipy.io import wavfile
+
+
+# Frequency bands (Hz) of the band power features: voice fundamentals,
+# speech formants, and hiss / clatter
+AUDIO_BANDS = [(50, 300), (300, 3000), (3000, 8000)]
+
+
+def session_audio(session_dir):
+    """
+    Path of the .wav of a session (extract-audio.py), or None; the
+    <name>.part.wav of a conversion still running (or killed) is skipped
+    """
+    paths = sorted(path for path in glob.glob(f"{session_dir}/*.wav") if not path.endswith(".part.wav"))
+    return paths[0] if paths else None
+
+
+def read_wav(path):
+    """
+    Memory-mapped samples (n_frames x n_channels) and sampling rate of a
+    PCM or float WAV; nothing is read until the samples are indexed
+    """
+    rate, data = wavfile.read(path, mmap=True)
+    return data.reshape(len(data), -1), rate
+
+
+def _to_float(block):
+    # PCM -> float32 in [-1, 1], channels averaged to mono
+    if block.dtype == np.uint8:
+        block = (block.astype(np.float32) - 128) / 128
+    elif block.dtype.kind == "i":
+        block = block.astype(np.float32) / -float(np.iinfo(block.dtype).min)
+    return block.astype(np.float32, copy=False).mean(axis=1)
+
+
+def audio_start(events):
+    """
+    Epoch seconds of the first audio sample: events (sensor_tools.load_events)
+    carry both the epoch time and offset_ms, the time into the video
+    """
+    return float(np.median(events["epoch_s"] - events["offset_ms"] / 1000))
+
+
+def window_features(X, rate, bands=AUDIO_BANDS):
+    """
+    Features of the windows in the rows of X (float, one window per row):
+    audio_rms, audio_zcr (zero crossings per second) and the mean power in
+    each band, audio_band_<lo>_<hi>, all computed for all rows at once
+    """
+    win = X.shape[1]
+    feats = {
+        "audio_rms": np.sqrt(np.mean(X ** 2, axis=1)),
+        "audio_zcr": np.count_nonzero(np.diff(np.signbit(X), axis=1), axis=1) * rate / win,
+    }
+    # Hann-windowed one-sided power spectrum, scaled so the bins sum to the
+    # mean square of the window
+    taper = np.hanning(win).astype(np.float32)
+    power = np.abs(np.fft.rfft(X * taper, axis=1)) ** 2 * (2 / (win * np.sum(taper ** 2)))
+    freqs = np.fft.rfftfreq(win, 1 / rate)
+    for lo, hi in bands:
+        feats[f"audio_band_{lo}_{hi}"] = power[:, (freqs >= lo) & (freqs < hi)].sum(axis=1)
+    return feats
+
+
+def iter_audio_features(path, audio_t0_epoch_s, f_s=10, t_start=None, n=None, win_s=None,
+                        bands=AUDIO_BANDS, block_s=60.0):
+    """
+    Audio features on a fixed-rate grid, one DataFrame per block of block_s
+    seconds.
+
+    audio_t0_epoch_s: epoch time of the first sample (audio_start)
+    f_s, t_start, n: grid of resample_streams, points t_start + k / f_s for
+                     k < n; by default the span of the audio
+    win_s: analysis window centred on each grid point, default 1 / f_s;
+           points whose window is not all inside the audio are NaN
+    Rows have time_s (seconds from t_start) and the window_features columns.
+    """
+    data, rate = read_wav(path)
+    win = int(round((win_s or 1 / f_s) * rate))
+    if t_start is None:
+        t_start = audio_t0_epoch_s
+    if n is None:
+        n = int(np.floor(len(data) / rate * f_s + 1e-9)) + 1
+    step = max(int(block_s * f_s), 1)
+
+    for k0 in range(0, n, step):
+        k = np.arange(k0, min(k0 + step, n))
+        # First sample of every window; rounding keeps the grid exact even
+        # when rate / f_s is not a whole number of samples
+        starts = np.round((t_start + k / f_s - audio_t0_epoch_s) * rate).astype(np.int64) - win // 2
+        inside = (starts >= 0) & (starts + win <= len(data))
+
+        feats = {}
+        if inside.any():
+            s0, s1 = starts[inside][0], starts[inside][-1] + win
+            block = _to_float(data[s0:s1])
+            X = block[starts[inside, None] - s0 + np.arange(win)]
+            feats = window_features(X, rate, bands)
+
+        out = {"time_s": k / f_s}
+        for name in ["audio_rms", "audio_zcr"] + [f"audio_band_{lo}_{hi}" for lo, hi in bands]:
+            out[name] = np.full(len(k), np.nan)
+            if feats:
+                out[name][inside] = feats[name]
+        yield pd.DataFrame(out, index=k)
+
+
+def audio_features(path, audio_t0_epoch_s, f_s=10, t_start=None, n=None, win_s=None,
+                   bands=AUDIO_BANDS, block_s=60.0):
+    """
+    All blocks of iter_audio_features in one DataFrame, with the grid start
+    in df.attrs["t0_epoch_s"] like resample_streams, so it lines up row for
+    row with a sensor grid of the same f_s, t_start and n
+    """
+    blocks = list(iter_audio_features(path, audio_t0_epoch_s, f_s, t_start, n, win_s, bands, block_s))
+    columns = ["time_s", "audio_rms", "audio_zcr"] + [f"audio_band_{lo}_{hi}" for lo, hi in bands]
+    audio_df = pd.concat(blocks) if blocks else pd.DataFrame(columns=columns, dtype=float)
+    audio_df.attrs["t0_epoch_s"] = audio_t0_epoch_s if t_start is None else t_start
+    return audio_df
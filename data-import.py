@@ -1,195 +1,779 @@
-#%% Imports
-import numpy as np
-import os
-import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import argparse
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-data_path = 'Data/'
-load_dotenv()
-
-SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("VITE_SUPABASE_PUBLISHABLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-SENSOR_TYPE_IDS = {
-    "accelerometer": '3b48eed5-6ece-4eb8-8c88-b5e645839385',
-    "gyroscope": 'd4ad2653-b430-40c2-9f47-bdc140119c57',
-    "linear_acceleration": '98a08aec-2fa6-4f63-9386-0f43015d701c',
-    "relative_orientation": 'c850391c-5cf3-4b3f-9fac-26438f5a9353'
-}
-
-def fetch_events(recording_id):
-    query = (
-        supabase.table("events")
-        .select("recording_id,event_code_id,timestamp,offset_ms,created_at,event_codes(e_id,e_description_butt)")
-        .eq("recording_id", recording_id)
-    )
-    response = query.execute()
-    return response.data
-
-def fetch_accelerometer_data(recording_id):
-    query = (
-        supabase.table("sensor_data")
-        .select("*")
-        .eq("sensor_type_id", SENSOR_TYPE_IDS.get('accelerometer'))
-        .eq("recording_id", recording_id)
-    )
-    response = query.execute()
-    return response.data
-
-def fetch_gyroscope_data(recording_id):
-    query = (
-        supabase.table("sensor_data")
-        .select("*")
-        .eq("sensor_type_id", SENSOR_TYPE_IDS.get('gyroscope'))
-        .eq("recording_id", recording_id)
-    )
-    response = query.execute()
-    return response.data
-
-def fetch_linear_acceleration_data(recording_id):
-    query = (
-        supabase.table("sensor_data")
-        .select("*")
-        .eq("sensor_type_id", SENSOR_TYPE_IDS.get('linear_acceleration'))
-        .eq("recording_id", recording_id)
-    )
-    response = query.execute()
-    return response.data
-
-def fetch_relative_orientation_data(recording_id):
-    query = (
-        supabase.table("sensor_data")
-        .select("*")
-        .eq("sensor_type_id", SENSOR_TYPE_IDS.get('relative_orientation'))
-        .eq("recording_id", recording_id)
-    )
-    response = query.execute()
-    return response.data
-
-def parse_signals(data):
-    xs, ys, zs = [], [], []
-    for row in data:
-        signal_json = row.get("data")
-        if signal_json:
-            try:
-                # If it's already a dict, use it directly
-                if isinstance(signal_json, dict):
-                    signal = signal_json
-                else:
-                    signal = json.loads(signal_json)
-                xs.append(signal.get("x", 0))
-                ys.append(signal.get("y", 0))
-                zs.append(signal.get("z", 0))
-            except Exception as e:
-                print(f"Error parsing signal: {e}")
-
-    return xs, ys, zs
-
-def parse_signals_to_dataframe(data, is_quaternion=False):
-    records = []
-    for row in data:
-        signal_json = row.get("data")
-        if signal_json:
-            if isinstance(signal_json, dict):
-                signal = signal_json
-            else:
-                signal = json.loads(signal_json)
-            if is_quaternion:
-                quat = signal.get("quaternion", [0, 0, 0, 0])
-                records.append({
-                    "q0": quat[0],
-                    "q1": quat[1],
-                    "q2": quat[2],
-                    "q3": quat[3],
-                    "timestamp": row.get("timestamp")
-                })
-            else:
-                records.append({
-                    "x": signal.get("x", 0),
-                    "y": signal.get("y", 0),
-                    "z": signal.get("z", 0),
-                    "timestamp": row.get("timestamp")
-                })
-    return pd.DataFrame(records)
-
-def plot_signals_from_dataframe(df, title, filename):
-    plt.figure(figsize=(12, 6))
-    plt.plot(df.index, df["x"], label='X')
-    plt.plot(df.index, df["y"], label='Y')
-    plt.plot(df.index, df["z"], label='Z')
-    plt.xlabel('Sample')
-    plt.ylabel('Acceleration')
-    plt.title(title)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(filename)
-    print(f"Plot saved as {filename}")
-
-def plot_quaternion_from_dataframe(df, title, filename):
-    plt.figure(figsize=(12, 6))
-    plt.plot(df.index, df["q0"], label='q0')
-    plt.plot(df.index, df["q1"], label='q1')
-    plt.plot(df.index, df["q2"], label='q2')
-    plt.plot(df.index, df["q3"], label='q3')
-    plt.xlabel('Sample')
-    plt.ylabel('Quaternion Value')
-    plt.title(title)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(filename)
-    print(f"Plot saved as {filename}")
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Fetch and plot accelerometer data from Supabase")
-    parser.add_argument("recording_id", help="Recording DB id")
-    parser.add_argument("uID", help="User id, for example: 66001")
-    parser.add_argument("date", help="Date, for example: 2025-12-11")
-    parser.add_argument("sID", help="Recording id, for example: S1")
-    args = parser.parse_args()
-
-    recording_id = args.recording_id
-    uID = args.uID
-    date = args.date
-    sID = args.sID
-
-    # Fetch sensor data
-    accel_data = fetch_accelerometer_data(args.recording_id)
-    gyro_data = fetch_gyroscope_data(args.recording_id)
-    linear_data = fetch_linear_acceleration_data(args.recording_id)
-    relative_orientation_data = fetch_relative_orientation_data(args.recording_id)
-
-    sensor_data_dir = f"./Data/{uID}/{date}/{sID}/sensor-data"
-    os.makedirs(sensor_data_dir, exist_ok=True)
-
-    plots_dir = f"./Data/{uID}/{date}/{sID}/plots"
-    os.makedirs(plots_dir, exist_ok=True)
-
-    accel_df = parse_signals_to_dataframe(accel_data)
-    plot_signals_from_dataframe(accel_df, "Accelerometer Signal", f"./Data/{uID}/{date}/{sID}/plots/accel_signal_plot.png")
-    accel_df.to_csv(f"./Data/{uID}/{date}/{sID}/sensor-data/accel_signal_data.csv", index=False)
-
-    gyro_df = parse_signals_to_dataframe(gyro_data)
-    plot_signals_from_dataframe(gyro_df, "Gyroscope Signal", f"./Data/{uID}/{date}/{sID}/plots/gyro_signal_plot.png")
-    gyro_df.to_csv(f"./Data/{uID}/{date}/{sID}/sensor-data/gyro_signal_data.csv", index=False)
-
-    linear_df = parse_signals_to_dataframe(linear_data)
-    plot_signals_from_dataframe(linear_df, "Linear Acceleration Signal", f"./Data/{uID}/{date}/{sID}/plots/linear_signal_plot.png")
-    linear_df.to_csv(f"./Data/{uID}/{date}/{sID}/sensor-data/linear_signal_data.csv", index=False)
-
-    relative_orientation_df = parse_signals_to_dataframe(relative_orientation_data, is_quaternion=True)
-    plot_quaternion_from_dataframe(
-        relative_orientation_df,
-        "Relative Orientation Quaternion Signal",
-        f"./Data/{uID}/{date}/{sID}/plots/relative_orientation_signal_plot.png"
-    )
-    relative_orientation_df.to_csv(f"./Data/{uID}/{date}/{sID}/sensor-data/relative_orientation_signal_data.csv", index=False)
-
-    # Fetch and save events
-    events = fetch_events(args.recording_id)
-    events_df = pd.DataFrame(events)
-    events_df.to_csv(f"./Data/{uID}/{date}/{sID}/events.csv", index=False)
\ No newline at end of file
+#%% Imports
+# numpy, pandas, matplotlib, httpx and supabase are imported where they are
+# used, so --help, argument errors and the cron start-up stay cheap
+import os
+import json
+import operator
+import time
+import random
+import shutil
+import sqlite3
+import threading
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+data_path = 'Data/'
+registry_path = 'uIDs_sIDs.xlsx'
+watermark_db = data_path + 'import_cache.sqlite'
+
+# One connection pool for all fetch threads, also across sessions in batch mode
+HTTP_POOL_SIZE = 20
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    The Supabase client, created on first use and then shared by every
+    fetch thread and session of the process, together with its httpx
+    connection pool
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from dotenv import load_dotenv
+            from supabase import create_client, ClientOptions
+
+            load_dotenv()
+            http_client = httpx.Client(
+                timeout=120,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+            )
+            _client = create_client(
+                os.getenv("VITE_SUPABASE_URL"),
+                os.getenv("VITE_SUPABASE_PUBLISHABLE_KEY"),
+                options=ClientOptions(httpx_client=http_client)
+            )
+        return _client
+
+SENSOR_TYPE_IDS = {
+    "accelerometer": '3b48eed5-6ece-4eb8-8c88-b5e645839385',
+    "gyroscope": 'd4ad2653-b430-40c2-9f47-bdc140119c57',
+    "linear_acceleration": '98a08aec-2fa6-4f63-9386-0f43015d701c',
+    "relative_orientation": 'c850391c-5cf3-4b3f-9fac-26438f5a9353'
+}
+
+SENSOR_OUTPUTS = {
+    "accelerometer": ("accel", "Accelerometer Signal"),
+    "gyroscope": ("gyro", "Gyroscope Signal"),
+    "linear_acceleration": ("linear", "Linear Acceleration Signal"),
+    "relative_orientation": ("relative_orientation", "Relative Orientation Quaternion Signal")
+}
+
+# Columns and JSON paths that parse_signals_to_dataframe needs, extracted by
+# PostgREST so the rest of each sensor_data row never crosses the wire; the
+# id tells rows apart that share the watermark timestamp (import_recording)
+SENSOR_COLUMNS = {
+    "xyz": "id,timestamp,x:data->x,y:data->y,z:data->z",
+    "quaternion": "id,timestamp,quaternion:data->quaternion"
+}
+
+PAGE_SIZE = 1000
+
+# Per-page retries: exponential backoff with full jitter, up to RETRIES times
+RETRIES = 5
+BACKOFF_S = 0.5
+BACKOFF_MAX_S = 30
+
+# HTTP statuses (and the PostgREST statement timeout) worth another try
+TRANSIENT_CODES = {"408", "425", "429", "500", "502", "503", "504", "520", "522", "524", "57014"}
+
+
+def _transient(e):
+    import httpx
+    if isinstance(e, httpx.TransportError):
+        return True
+    return str(getattr(e, "code", None)) in TRANSIENT_CODES
+
+def with_retries(fn, retries=None, backoff_s=None):
+    """
+    fn() with transient failures (timeouts, dropped connections, 5xx/429)
+    retried after uniform(0, min(BACKOFF_MAX_S, backoff_s * 2**attempt))
+    seconds; other errors and the last failure are raised
+    """
+    retries = RETRIES if retries is None else retries
+    backoff_s = BACKOFF_S if backoff_s is None else backoff_s
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries or not _transient(e):
+                raise
+            delay = random.uniform(0, min(BACKOFF_MAX_S, backoff_s * 2 ** attempt))
+            reason = getattr(e, "code", None) or type(e).__name__
+            print(f"Retry {attempt + 1}/{retries} in {delay:.2f} s after {reason}")
+            time.sleep(delay)
+
+def _execute(query):
+    # Retries happen in with_retries, not in postgrest's own 503/520 loop
+    if hasattr(query, "retry"):
+        query = query.retry(False)
+    return query.execute()
+
+def _checkpoint_pages(checkpoint, key):
+    """
+    Paths of the pages completed so far, if the checkpoint is of the same
+    query; a checkpoint of another query is cleared. A page_*.json.tmp left
+    by a crash in the middle of _write_json is half written and deleted.
+    """
+    meta_path = f"{checkpoint}/query.json"
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == key:
+                names = sorted(os.listdir(checkpoint))
+                for p in names:
+                    if p.endswith(".tmp"):
+                        os.remove(f"{checkpoint}/{p}")
+                return [f"{checkpoint}/{p}" for p in names if p.startswith("page_") and p.endswith(".json")]
+    clear_checkpoint(checkpoint)
+    os.makedirs(checkpoint)
+    _write_json(meta_path, key)
+    return []
+
+def _write_json(path, obj):
+    # Write aside and rename, so a crash never leaves half a page
+    with open(path + ".tmp", "w") as f:
+        json.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+def clear_checkpoint(checkpoint):
+    shutil.rmtree(checkpoint, ignore_errors=True)
+
+def _after(query, row):
+    # Keyset condition: the rows after row in (timestamp, id) order; the
+    # timestamp is quoted for its '.' and ':'
+    ts = json.dumps(row["timestamp"])
+    return query.or_(f"timestamp.gt.{ts},and(timestamp.eq.{ts},id.gt.{row['id']})")
+
+def iter_pages(query_fn, page_size=PAGE_SIZE, checkpoint=None, key=None):
+    """
+    Page through a PostgREST query until an empty page, yielding one page
+    (list of rows) at a time.
+    Every page asks for the rows after the last row of the previous one
+    (keyset paging), so the server walks the (timestamp, id) order from
+    there instead of skipping all earlier rows again as with OFFSET, which
+    made a whole stream O(n^2 / page_size). query_fn() must therefore
+    return a fresh query builder ordered by timestamp, then id, whose rows
+    include both columns.
+    A page may come back shorter than page_size when the server caps rows per
+    response (max-rows), so only an empty page ends the loop.
+
+    Every page request is retried on transient errors (with_retries).
+    checkpoint: directory keeping each completed page as page_NNNNNN.json,
+                with key (any JSON value identifying the query) in
+                query.json. A rerun after a failure yields the stored pages
+                again and continues after the last stored row; the caller
+                clears it once the rows are stored.
+    """
+    last, n_pages = None, 0
+    for path in _checkpoint_pages(checkpoint, key) if checkpoint else []:
+        with open(path) as f:
+            page = json.load(f)
+        last = page[-1]
+        n_pages += 1
+        yield page
+    while True:
+        page = with_retries(
+            lambda: _execute((query_fn() if last is None else _after(query_fn(), last)).limit(page_size))
+        ).data
+        if not page:
+            return
+        if checkpoint:
+            _write_json(f"{checkpoint}/page_{n_pages:06d}.json", page)
+            n_pages += 1
+        last = page[-1]
+        yield page
+
+def fetch_pages(query_fn, page_size=PAGE_SIZE, checkpoint=None, key=None):
+    """
+    All rows of iter_pages in one list
+    """
+    return [row for page in iter_pages(query_fn, page_size, checkpoint, key) for row in page]
+
+def _since(query, since):
+    # gte, not gt: rows that reach the server late with the same timestamp as
+    # the last imported row would otherwise be skipped for good; the rows seen
+    # before are dropped by id (_new_rows)
+    return query if since is None else query.gte("timestamp", since)
+
+def event_pages(recording_id, page_size=PAGE_SIZE, since=None, checkpoint=None):
+    def query():
+        return _since(
+            get_client().table("events")
+            .select("id,recording_id,event_code_id,timestamp,offset_ms,created_at,event_codes(e_id,e_description_butt)")
+            .eq("recording_id", recording_id)
+            .order("timestamp").order("id"),
+            since
+        )
+    return iter_pages(query, page_size, checkpoint, key=["events", recording_id, since])
+
+def sensor_pages(recording_id, sensor, page_size=PAGE_SIZE, since=None, columns=None, checkpoint=None):
+    """
+    Pages of one sensor type, all rows or only those at or after the since
+    timestamp.
+    columns: PostgREST select list, by default only the id, timestamp and
+             signal values (SENSOR_COLUMNS); "*" fetches whole rows. Paging
+             needs id and timestamp in any list (iter_pages).
+    """
+    if columns is None:
+        columns = SENSOR_COLUMNS["quaternion" if sensor == "relative_orientation" else "xyz"]
+
+    def query():
+        return _since(
+            get_client().table("sensor_data")
+            .select(columns)
+            .eq("sensor_type_id", SENSOR_TYPE_IDS.get(sensor))
+            .eq("recording_id", recording_id)
+            .order("timestamp").order("id"),
+            since
+        )
+    return iter_pages(query, page_size, checkpoint, key=[sensor, recording_id, since, columns])
+
+def fetch_events(recording_id, page_size=PAGE_SIZE, since=None, checkpoint=None):
+    return [row for page in event_pages(recording_id, page_size, since, checkpoint) for row in page]
+
+def fetch_sensor_data(recording_id, sensor, page_size=PAGE_SIZE, since=None, columns=None, checkpoint=None):
+    return [row for page in sensor_pages(recording_id, sensor, page_size, since, columns, checkpoint) for row in page]
+
+def fetch_accelerometer_data(recording_id):
+    return fetch_sensor_data(recording_id, "accelerometer")
+
+def fetch_gyroscope_data(recording_id):
+    return fetch_sensor_data(recording_id, "gyroscope")
+
+def fetch_linear_acceleration_data(recording_id):
+    return fetch_sensor_data(recording_id, "linear_acceleration")
+
+def fetch_relative_orientation_data(recording_id):
+    return fetch_sensor_data(recording_id, "relative_orientation")
+
+def stream_recording(recording_id, on_page, page_size=PAGE_SIZE, n_workers=5, since=None, checkpoint_dir=None):
+    """
+    Fetch the four sensor types and the events of a recording concurrently
+    and hand each page to on_page(name, rows) as it arrives, so no stream is
+    held in memory whole. on_page is called from the fetch threads, but never
+    concurrently for the same name.
+    since: optional dict name -> timestamp, fetch only the rows of that stream
+           at or after it
+    checkpoint_dir: keep completed pages in checkpoint_dir/<name> so a failed
+                    fetch resumes where it stopped (see iter_pages)
+    Returns dict name -> (number of rows, last timestamp or None), names as
+    in SENSOR_TYPE_IDS plus "events", and prints rows/s per stream and overall.
+    """
+    since = since or {}
+    checkpoint = {name: checkpoint_dir and f"{checkpoint_dir}/{name}" for name in list(SENSOR_TYPE_IDS) + ["events"]}
+    jobs = {
+        name: partial(sensor_pages, recording_id, name, page_size, since.get(name), checkpoint=checkpoint[name])
+        for name in SENSOR_TYPE_IDS
+    }
+    jobs["events"] = partial(event_pages, recording_id, page_size, since.get("events"), checkpoint=checkpoint["events"])
+
+    def run(name):
+        t_start = time.perf_counter()
+        n_rows, last = 0, None
+        for page in jobs[name]():
+            on_page(name, page)
+            n_rows += len(page)
+            last = page[-1]["timestamp"]
+        return n_rows, last, time.perf_counter() - t_start
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = {name: pool.submit(run, name) for name in jobs}
+        results = {name: f.result() for name, f in futures.items()}
+    elapsed = time.perf_counter() - t0
+
+    for name, (n_rows, _, seconds) in results.items():
+        print(f"{name}: {n_rows} rows in {seconds:.2f} s ({n_rows / max(seconds, 1e-9):,.0f} rows/s)")
+    n_total = sum(n_rows for n_rows, _, _ in results.values())
+    print(f"Total: {n_total} rows in {elapsed:.2f} s ({n_total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return {name: (n_rows, last) for name, (n_rows, last, _) in results.items()}
+
+def fetch_recording(recording_id, page_size=PAGE_SIZE, n_workers=5, since=None, checkpoint_dir=None):
+    """
+    Fetch the four sensor types and the events of a recording concurrently
+    (stream_recording) and return dict name -> rows
+    """
+    fetched = {name: [] for name in list(SENSOR_TYPE_IDS) + ["events"]}
+    stream_recording(recording_id, lambda name, rows: fetched[name].extend(rows), page_size, n_workers, since, checkpoint_dir)
+    return fetched
+
+def _stream_key(name):
+    return SENSOR_TYPE_IDS.get(name, name)
+
+_local = threading.local()
+
+def _watermark_con(db_path=None):
+    """
+    Connection to the watermark cache, opened once per thread and path and
+    then reused for every session the thread imports
+    """
+    path = db_path or watermark_db
+    cons = _local.__dict__.setdefault("watermark_cons", {})
+    if path not in cons:
+        con = sqlite3.connect(path)
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "recording_id TEXT, sensor_type_id TEXT, last_timestamp TEXT, n_rows INTEGER, "
+            "last_ids TEXT, csv_bytes INTEGER, PRIMARY KEY (recording_id, sensor_type_id))"
+        )
+        # Columns that caches written by older versions lack
+        columns = [col[1] for col in con.execute("PRAGMA table_info(watermarks)")]
+        for column in ["last_ids TEXT", "csv_bytes INTEGER"]:
+            if column.split()[0] not in columns:
+                con.execute(f"ALTER TABLE watermarks ADD COLUMN {column}")
+        cons[path] = con
+    return cons[path]
+
+def _read_watermark_columns(recording_id, columns, db_path=None):
+    # dict name -> tuple of the columns, for the streams that have a watermark
+    rows = _watermark_con(db_path).execute(
+        f"SELECT sensor_type_id, {', '.join(columns)} FROM watermarks WHERE recording_id = ?",
+        (recording_id,)
+    ).fetchall()
+    by_key = {row[0]: row[1:] for row in rows}
+    names = list(SENSOR_TYPE_IDS) + ["events"]
+    return {name: by_key[_stream_key(name)] for name in names if _stream_key(name) in by_key}
+
+def read_watermarks(recording_id, db_path=None):
+    """
+    Last imported timestamp per stream of a recording, from the local cache
+    """
+    marks = _read_watermark_columns(recording_id, ["last_timestamp"], db_path)
+    return {name: ts for name, (ts,) in marks.items()}
+
+def read_watermark_ids(recording_id, db_path=None):
+    """
+    Ids of the imported rows at the watermark timestamp per stream of a
+    recording; None for watermarks written before the ids were kept
+    """
+    marks = _read_watermark_columns(recording_id, ["last_ids"], db_path)
+    return {name: None if ids is None else set(json.loads(ids)) for name, (ids,) in marks.items()}
+
+def read_watermark_sizes(recording_id, db_path=None):
+    """
+    (rows, CSV bytes) per stream of a recording as of its watermark; the
+    bytes are None for watermarks written before the sizes were kept
+    """
+    return _read_watermark_columns(recording_id, ["n_rows", "csv_bytes"], db_path)
+
+def write_watermark(recording_id, name, last_timestamp, n_new, db_path=None, reset=False, last_ids=None,
+                    csv_bytes=None):
+    """
+    last_ids: ids of the imported rows at last_timestamp, so that a re-import
+              that fetches from last_timestamp on skips only those
+    csv_bytes: size of the stream's CSV with these rows in it
+    """
+    con = _watermark_con(db_path)
+    last_ids = None if last_ids is None else json.dumps(sorted(last_ids))
+    with con:
+        con.execute(
+            "INSERT INTO watermarks (recording_id, sensor_type_id, last_timestamp, n_rows, last_ids, csv_bytes) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (recording_id, sensor_type_id) DO UPDATE SET "
+            "last_timestamp = excluded.last_timestamp, last_ids = excluded.last_ids, "
+            "csv_bytes = excluded.csv_bytes, "
+            "n_rows = CASE WHEN ? THEN excluded.n_rows ELSE n_rows + excluded.n_rows END",
+            (recording_id, _stream_key(name), last_timestamp, n_new, last_ids, csv_bytes, reset)
+        )
+
+def delete_watermark(recording_id, name, db_path=None):
+    con = _watermark_con(db_path)
+    with con:
+        con.execute(
+            "DELETE FROM watermarks WHERE recording_id = ? AND sensor_type_id = ?",
+            (recording_id, _stream_key(name))
+        )
+
+def _decode(payloads):
+    """
+    Decode JSON strings in one json.loads over the joined buffer; if any of
+    them is malformed, fall back to per-row decoding with None for bad rows
+    """
+    try:
+        return json.loads("[" + ",".join(payloads) + "]")
+    except json.JSONDecodeError:
+        pass
+    signals = []
+    for payload in payloads:
+        try:
+            signals.append(json.loads(payload))
+        except json.JSONDecodeError as e:
+            print(f"Error parsing signal: {e}")
+            signals.append(None)
+    return signals
+
+def _signals(data):
+    """
+    Signal dicts and timestamps of the rows that have a signal: the decoded
+    data JSON of whole rows, or the row itself when the values were extracted
+    server-side (SENSOR_COLUMNS)
+    """
+    if data and "data" not in data[0]:
+        # Projected rows: all values null means the data was null
+        keys = [key for key in data[0] if key not in ("id", "timestamp")]
+        values = zip(*(map(operator.itemgetter(key), data) for key in keys))
+        signals = [row if has_values else None for row, has_values in zip(data, map(((None,) * len(keys)).__ne__, values))]
+    else:
+        signals = [row.get("data") for row in data]
+    text = [i for i, signal in enumerate(signals) if signal and not isinstance(signal, dict)]
+    if text:
+        for i, signal in zip(text, _decode([signals[i] for i in text])):
+            signals[i] = signal
+
+    timestamps = [row.get("timestamp") for row in data]
+    if not all(signals):
+        keep = [i for i, signal in enumerate(signals) if signal]
+        signals = [signals[i] for i in keep]
+        timestamps = [timestamps[i] for i in keep]
+    return signals, timestamps
+
+def _column(signals, key):
+    import numpy as np
+    # Missing keys read as 0 and JSON nulls as NaN, as in the per-row parser.
+    # Projected rows cannot tell the two apart (data->x is null either way),
+    # so a missing key reads as NaN there
+    return np.array([signal.get(key, 0) for signal in signals], dtype=np.float64)
+
+def parse_signals(data):
+    signals, _ = _signals(data)
+    return _column(signals, "x"), _column(signals, "y"), _column(signals, "z")
+
+def parse_signals_to_dataframe(data, is_quaternion=False):
+    """
+    Sensor rows -> DataFrame with x, y, z (or q0..q3) float64 columns and the
+    timestamp, built column-wise without per-row dicts
+    """
+    import numpy as np
+    import pandas as pd
+    signals, timestamps = _signals(data)
+    if is_quaternion:
+        quats = [signal.get("quaternion", (0, 0, 0, 0)) for signal in signals]
+        quats = [(np.nan,) * 4 if quat is None else quat for quat in quats]
+        quats = np.array(quats, dtype=np.float64).reshape(-1, 4)
+        df = pd.DataFrame(quats, columns=["q0", "q1", "q2", "q3"])
+    else:
+        df = pd.DataFrame({key: _column(signals, key) for key in ["x", "y", "z"]})
+    df["timestamp"] = timestamps
+    return df
+
+def _plot_columns(ax, df, columns, labels, downsample):
+    import plot_tools as pt
+    # At most ~2 points per pixel column per trace, keeping min/max spikes
+    max_points = 2 * pt.plot_width_px(ax) if downsample else len(df)
+    for col, label in zip(columns, labels):
+        ax.plot(*pt.minmax_downsample(df.index, df[col], max_points), label=label)
+
+def plot_signals_from_dataframe(df, title, filename, downsample=True):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 6))
+    _plot_columns(ax, df, ["x", "y", "z"], ['X', 'Y', 'Z'], downsample)
+    ax.set_xlabel('Sample')
+    ax.set_ylabel('Acceleration')
+    ax.set_title(title)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+    print(f"Plot saved as {filename}")
+
+def plot_quaternion_from_dataframe(df, title, filename, downsample=True):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 6))
+    _plot_columns(ax, df, ["q0", "q1", "q2", "q3"], ['q0', 'q1', 'q2', 'q3'], downsample)
+    ax.set_xlabel('Sample')
+    ax.set_ylabel('Quaternion Value')
+    ax.set_title(title)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+    print(f"Plot saved as {filename}")
+
+def _session_paths(uID, date, sID):
+    session_dir = f"{data_path}{uID}/{date}/{sID}"
+    paths = {name: f"{session_dir}/sensor-data/{prefix}_signal_data.csv" for name, (prefix, _) in SENSOR_OUTPUTS.items()}
+    paths["events"] = f"{session_dir}/events.csv"
+    return session_dir, paths
+
+def _new_rows(rows, since, seen_ids):
+    """
+    Rows of a page fetched from the since timestamp on (_since) that were not
+    imported before: those at since are kept only if their id is not in
+    seen_ids (none of them if seen_ids is None, a watermark without ids)
+    """
+    if since is None:
+        return rows
+    return [row for row in rows
+            if row["timestamp"] != since or (seen_ids is not None and row["id"] not in seen_ids)]
+
+def _commit_part(path, append):
+    # Move the rows written during the fetch into the real file
+    part = path + ".part"
+    if append:
+        with open(part, "rb") as src, open(path, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(part)
+    else:
+        os.replace(part, path)
+
+def _recover(recording_id, session_dir, paths):
+    """
+    Undo what an import committed after the last watermarks it wrote: rows
+    appended to a CSV past the size kept with its watermark are cut off, and
+    a bundle whose row counts differ from the watermarks is rebuilt from the
+    CSVs, so those rows are fetched again instead of being appended twice.
+    A CSV shorter than its watermark lost rows and loses its watermark, so
+    the stream is imported from scratch.
+    """
+    import sensor_tools as st
+    sizes = {}
+    for name, (n_rows, csv_bytes) in read_watermark_sizes(recording_id).items():
+        if csv_bytes is None or not os.path.exists(paths[name]):
+            continue
+        size = os.path.getsize(paths[name])
+        if size < csv_bytes:
+            delete_watermark(recording_id, name)
+            continue
+        if size > csv_bytes:
+            with open(paths[name], "r+b") as f:
+                f.truncate(csv_bytes)
+        sizes[name] = n_rows
+
+    bundle_rows = st.bundle_rows(session_dir)
+    if bundle_rows and any(bundle_rows.get(SENSOR_OUTPUTS[name][0], 0) != n_rows
+                           for name, n_rows in sizes.items() if name in SENSOR_OUTPUTS):
+        st.bundle_from_csv(session_dir)
+
+def import_recording(recording_id, uID, date, sID, full=False):
+    """
+    Import one recording into Data/{uID}/{date}/{sID}.
+
+    Only rows from each stream's watermark on (the last imported timestamp,
+    kept in watermark_db) are fetched, and those not imported before (by id)
+    are appended to the existing files, so a re-import without new data
+    fetches only the rows at the watermarks. With full, or
+    when a file or its watermark is missing, the stream is fetched and written
+    from scratch.
+    Rows are written as the pages arrive (stream_recording): each page is
+    parsed and appended to a <file>.part next to the CSV and to the session
+    bundle (sensor_tools.BundleWriter), so memory does not grow with the
+    length of the recording. The parts replace or extend the CSVs only once
+    every stream is complete, and the watermarks, which keep the size of each
+    CSV, move after them; a run that stops in between is rolled back to the
+    watermarks by the next one (_recover).
+    Pages are checkpointed under {session_dir}/.checkpoints while they are
+    fetched, so after a failure the next run resumes at the missing page
+    (the parts are rewritten from the checkpoint). Only data is written;
+    PNGs are rendered afterwards by plot_sessions.
+    Returns dict name -> number of new rows.
+    """
+    import pandas as pd
+    import sensor_tools as st
+    session_dir, paths = _session_paths(uID, date, sID)
+    os.makedirs(f"{session_dir}/sensor-data", exist_ok=True)
+
+    since, seen_ids = {}, {}
+    if not full:
+        _recover(recording_id, session_dir, paths)
+        marks = read_watermarks(recording_id)
+        since = {name: marks.get(name) for name, path in paths.items() if os.path.exists(path)}
+        seen_ids = read_watermark_ids(recording_id)
+    append = {name: since.get(name) is not None for name in paths}
+    # Last timestamp fetched and the ids of the rows at it, per stream
+    last = {name: (since.get(name), seen_ids.get(name) or set()) for name in paths}
+
+    parts = {name: open(path + ".part", "w", newline="") for name, path in paths.items()}
+    n_written = dict.fromkeys(paths, 0)
+    bundle = st.BundleWriter(session_dir, append=[SENSOR_OUTPUTS[name][0] for name in SENSOR_OUTPUTS if append[name]])
+
+    def on_page(name, rows):
+        # Rows come ordered by timestamp and id, so a run of equal timestamps
+        # at the end of the page can continue on the next one
+        last_ts = rows[-1]["timestamp"]
+        ids = {row["id"] for row in rows if row["timestamp"] == last_ts}
+        last[name] = (last_ts, last[name][1] | ids if last[name][0] == last_ts else ids)
+        rows = _new_rows(rows, since.get(name), seen_ids.get(name))
+        if not rows:
+            return
+        if name == "events":
+            df = pd.DataFrame(rows).drop(columns="id")
+        else:
+            df = parse_signals_to_dataframe(rows, is_quaternion=name == "relative_orientation")
+            prefix = SENSOR_OUTPUTS[name][0]
+            bundle.write(prefix, st.sensor_records(df, prefix))
+        df.to_csv(parts[name], header=n_written[name] == 0 and not append[name], index=False)
+        n_written[name] += len(df)
+
+    # Fetch sensor data and events; completed pages survive a failed run
+    checkpoint_dir = f"{session_dir}/.checkpoints"
+    try:
+        stream_recording(recording_id, on_page, checkpoint_dir=checkpoint_dir, since=since)
+    except BaseException:
+        bundle.abort()
+        raise
+    finally:
+        for f in parts.values():
+            f.close()
+
+    for name in paths:
+        if n_written[name]:
+            # A replaced file must not be cut back to the old watermark's size
+            if not append[name]:
+                delete_watermark(recording_id, name)
+            _commit_part(paths[name], append[name])
+        else:
+            os.remove(paths[name] + ".part")
+    # Binary copy of the sensor data (sensors.npz) for fast loading; the
+    # watermarks move only once both the CSVs and the bundle have the rows
+    bundle.close()
+    for name in paths:
+        if n_written[name]:
+            last_ts, ids = last[name]
+            write_watermark(recording_id, name, last_ts, n_written[name], reset=not append[name], last_ids=ids,
+                            csv_bytes=os.path.getsize(paths[name]))
+
+    clear_checkpoint(checkpoint_dir)
+    return n_written
+
+def _plot_worker_init():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _plot_file(name, csv_path, png_path):
+    import pandas as pd
+    _, title = SENSOR_OUTPUTS[name]
+    df = pd.read_csv(csv_path)
+    if name == "relative_orientation":
+        plot_quaternion_from_dataframe(df, title, png_path)
+    else:
+        plot_signals_from_dataframe(df, title, png_path)
+    return png_path
+
+def plot_jobs(sessions, force=False):
+    """
+    (name, csv, png) of every sensor plot of the sessions ((uID, date, sID)
+    tuples) whose PNG is missing or older than its CSV; all of them with force
+    """
+    jobs = []
+    for uID, date, sID in sessions:
+        session_dir, paths = _session_paths(uID, date, sID)
+        for name, (prefix, _) in SENSOR_OUTPUTS.items():
+            csv_path = paths[name]
+            png_path = f"{session_dir}/plots/{prefix}_signal_plot.png"
+            if not os.path.exists(csv_path):
+                continue
+            if not force and os.path.exists(png_path) and os.path.getmtime(png_path) >= os.path.getmtime(csv_path):
+                continue
+            os.makedirs(f"{session_dir}/plots", exist_ok=True)
+            jobs.append((name, csv_path, png_path))
+    return jobs
+
+def plot_sessions(sessions, n_workers=None, force=False):
+    """
+    Plot stage, separate from the import: render the outdated sensor PNGs of
+    the sessions in a process pool on the Agg backend.
+    Returns the list of written PNGs.
+    """
+    jobs = plot_jobs(sessions, force=force)
+    if not jobs:
+        return []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_plot_worker_init) as pool:
+        written = list(pool.map(_plot_file, *zip(*jobs)))
+    print(f"{len(written)} plots in {time.perf_counter() - t0:.2f} s")
+    return written
+
+def read_sessions(path=None):
+    """
+    Sessions listed in the registry sheet (uIDs_sIDs.xlsx) as uID, date, sID,
+    recording_id; the id is taken from the "Database recording ID: ..." text
+    """
+    import pandas as pd
+    reg = pd.read_excel(path or registry_path, dtype=str)
+    sessions = pd.DataFrame({
+        "uID": reg["uID"].str.strip(),
+        "date": pd.to_datetime(reg["Date"]).dt.strftime("%Y-%m-%d"),
+        "sID": reg["sID"].str.strip(),
+        "recording_id": reg["DbRecordingID"].str.extract(r"([0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12})", expand=False),
+    })
+    return sessions.dropna(subset=["recording_id"]).reset_index(drop=True)
+
+def session_complete(recording_id, uID, date, sID):
+    """
+    A session from an earlier day whose sensor streams were all imported: its
+    recording does not grow any more, so batch imports can skip it
+    """
+    if date >= time.strftime("%Y-%m-%d"):
+        return False
+    _, paths = _session_paths(uID, date, sID)
+    if not all(os.path.exists(paths[name]) for name in SENSOR_TYPE_IDS):
+        return False
+    marks = read_watermarks(recording_id)
+    return all(name in marks for name in SENSOR_TYPE_IDS)
+
+def import_sessions(path=None, n_workers=4, full=False, skip_complete=True, plots=True):
+    """
+    Import every session of the registry, n_workers sessions at a time, all
+    through the one Supabase client and its connection pool. Complete
+    sessions are skipped unless full is set. With plots, the plot stage runs
+    once all imports are done.
+    Returns (and prints) a per-session summary with status, rows and seconds.
+    """
+    import pandas as pd
+    sessions = read_sessions(path)
+
+    def run(session):
+        if skip_complete and not full and session_complete(*session):
+            return {"status": "complete", "rows": 0, "seconds": 0.0}
+        t0 = time.perf_counter()
+        try:
+            counts = import_recording(*session, full=full)
+            status = "imported"
+        except Exception as e:
+            print(f"Import of {session.uID}/{session.date}/{session.sID} failed: {e}")
+            counts, status = {}, f"failed: {e}"
+        return {"status": status, "rows": sum(counts.values()), "seconds": time.perf_counter() - t0}
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        results = list(pool.map(run, sessions[["recording_id", "uID", "date", "sID"]].itertuples(index=False)))
+    elapsed = time.perf_counter() - t0
+
+    summary = pd.concat([sessions, pd.DataFrame(results)], axis=1)
+    print(summary.to_string(index=False))
+    print(f"{(summary['status'] == 'imported').sum()} of {len(summary)} sessions imported, "
+          f"{summary['rows'].sum()} rows in {elapsed:.2f} s")
+
+    if plots:
+        plot_sessions(sessions[["uID", "date", "sID"]].itertuples(index=False))
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch and plot accelerometer data from Supabase")
+    parser.add_argument("recording_id", nargs="?", help="Recording DB id")
+    parser.add_argument("uID", nargs="?", help="User id, for example: 66001")
+    parser.add_argument("date", nargs="?", help="Date, for example: 2025-12-11")
+    parser.add_argument("sID", nargs="?", help="Recording id, for example: S1")
+    parser.add_argument("--full", action="store_true", help="Re-import everything instead of only rows newer than the last import")
+    parser.add_argument("--all", nargs="?", const=registry_path, metavar="REGISTRY",
+                        help=f"Import every session listed in the registry sheet (default {registry_path})")
+    parser.add_argument("--workers", type=int, default=4, help="Sessions imported in parallel with --all")
+    parser.add_argument("--no-plots", action="store_true", help="Only import data, skip the plot stage")
+    parser.add_argument("--plots-only", action="store_true", help="Only render the outdated plots of imported sessions")
+    args = parser.parse_args()
+
+    if args.all and args.plots_only:
+        plot_sessions(read_sessions(args.all)[["uID", "date", "sID"]].itertuples(index=False))
+    elif args.all:
+        import_sessions(args.all, n_workers=args.workers, full=args.full, plots=not args.no_plots)
+    elif None in (args.recording_id, args.uID, args.date, args.sID):
+        parser.error("recording_id, uID, date and sID are required unless --all is given")
+    else:
+        if not args.plots_only:
+            import_recording(args.recording_id, args.uID, args.date, args.sID, full=args.full)
+        if not args.no_plots:
+            plot_sessions([(args.uID, args.date, args.sID)])
@@ -1,28 +1,182 @@
-import argparse
-import os
-from moviepy import AudioFileClip
-
-def main():
-    parser = argparse.ArgumentParser(description="Convert .webm video to .wav audio file")
-    parser.add_argument("recording_id", help="Recording DB id")
-    parser.add_argument("uID", help="User id, for example: 66001")
-    parser.add_argument("date", help="Date, for example: 2025-12-11")
-    parser.add_argument("sID", help="Recording id, for example: S1")
-    args = parser.parse_args()
-
-    video_dir = f"./Data/{args.uID}/{args.date}/{args.sID}"
-    # Find the first .webm file in the directory
-    webm_files = [f for f in os.listdir(video_dir) if f.lower().endswith('.webm')]
-    if not webm_files:
-        print(f"No .webm file found in {video_dir}")
-        return
-    video_path = os.path.join(video_dir, webm_files[0])
-    wav_path = os.path.splitext(video_path)[0] + ".wav"
-
-    print(f"Converting {video_path} to {wav_path} ...")
-    audio_clip = AudioFileClip(video_path)
-    audio_clip.write_audiofile(wav_path)
-    print(f"Saved audio to {wav_path}")
-
-if __name__ == "__main__":
-    main()
+import argparse
+import os
+import shutil
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+data_path = 'Data/'
+
+# Output extension and ffmpeg codec arguments per target: 16-bit PCM WAV for
+# analysis, or the audio stream copied as is (no re-encoding) into Matroska
+# audio, which takes any codec a .webm can hold (Opus, Vorbis)
+TARGETS = {
+    "wav": (".wav", ["-c:a", "pcm_s16le"]),
+    "copy": (".mka", ["-c:a", "copy"]),
+}
+
+# Seconds one ffmpeg call may take before it is killed, so a hung process
+# cannot hold a worker of the pool for good
+FFMPEG_TIMEOUT_S = 3600
+
+def ffmpeg_exe():
+    """
+    ffmpeg on the PATH, else the binary that comes with moviepy (imageio-ffmpeg)
+    """
+    exe = shutil.which("ffmpeg")
+    if exe is None:
+        try:
+            import imageio_ffmpeg
+            exe = imageio_ffmpeg.get_ffmpeg_exe()
+        except ImportError:
+            raise FileNotFoundError("ffmpeg not found: install it or pip install moviepy")
+    return exe
+
+def audio_path(video_path, target="wav"):
+    return os.path.splitext(video_path)[0] + TARGETS[target][0]
+
+def convert(video_path, out_path, target="wav", sample_rate=None, channels=None, exe=None,
+            timeout_s=FFMPEG_TIMEOUT_S):
+    """
+    Extract the audio track of video_path with one ffmpeg call, no Python-level
+    frame loop. sample_rate / channels resample and downmix (wav only).
+    The output is written aside and renamed, so an interrupted run never
+    leaves a truncated file that looks up to date. ffmpeg is killed after
+    timeout_s seconds.
+    Returns dict with the sizes, the audio duration (wav) and the seconds taken.
+    """
+    ext, codec = TARGETS[target]
+    tmp_path = os.path.splitext(out_path)[0] + ".part" + ext
+    cmd = [exe or ffmpeg_exe(), "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+           "-i", video_path, "-vn", *codec]
+    if target == "wav" and sample_rate:
+        cmd += ["-ar", str(sample_rate)]
+    if target == "wav" and channels:
+        cmd += ["-ac", str(channels)]
+
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd + [tmp_path], capture_output=True, text=True, timeout=timeout_s)
+        error = proc.stderr.strip() if proc.returncode != 0 else None
+    except subprocess.TimeoutExpired:
+        error = f"no result after {timeout_s} s"
+    seconds = time.perf_counter() - t0
+    if error is not None:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"ffmpeg failed on {video_path}: {error}")
+    os.replace(tmp_path, out_path)
+
+    # wave reads only PCM headers it knows (no WAVE_FORMAT_EXTENSIBLE, which
+    # ffmpeg writes for more than 2 channels); the duration is just reported
+    audio_s = None
+    if target == "wav":
+        try:
+            with wave.open(out_path) as w:
+                audio_s = w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError):
+            pass
+    return {
+        "video": video_path,
+        "audio": out_path,
+        "video_MB": os.path.getsize(video_path) / 1e6,
+        "audio_MB": os.path.getsize(out_path) / 1e6,
+        "audio_s": audio_s,
+        "seconds": seconds,
+    }
+
+def find_videos(root=None):
+    """
+    Every .webm under root (default data_path), sorted
+    """
+    videos = []
+    for dir_path, _, files in os.walk(root or data_path):
+        videos += [os.path.join(dir_path, f) for f in files if f.lower().endswith(".webm")]
+    return sorted(videos)
+
+def audio_jobs(videos, target="wav", force=False):
+    """
+    (video, audio) pairs whose audio file is missing or older than the video;
+    all of them with force
+    """
+    jobs = []
+    for video_path in videos:
+        out_path = audio_path(video_path, target)
+        if not force and os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(video_path):
+            continue
+        jobs.append((video_path, out_path))
+    return jobs
+
+def _report(res):
+    speed = f"{res['video_MB'] / max(res['seconds'], 1e-9):.1f} MB/s"
+    if res["audio_s"] is not None:
+        speed += f", {res['audio_s'] / max(res['seconds'], 1e-9):.0f}x realtime"
+    print(f"{res['audio']}: {res['audio_MB']:.1f} MB in {res['seconds']:.2f} s ({speed})")
+
+def extract_audio(videos, target="wav", n_workers=None, force=False, sample_rate=None, channels=None,
+                  timeout_s=FFMPEG_TIMEOUT_S):
+    """
+    Convert the outdated videos (audio_jobs) concurrently, one ffmpeg process
+    per file and up to n_workers at a time (default: number of CPUs).
+    A file that fails is reported and skipped, the others are still converted.
+    Prints the throughput per file and overall; returns the per-file results.
+    """
+    jobs = audio_jobs(videos, target, force)
+    print(f"{len(jobs)} of {len(videos)} videos to convert, {len(videos) - len(jobs)} up to date")
+    if not jobs:
+        return []
+
+    exe = ffmpeg_exe()
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(convert, video_path, out_path, target, sample_rate, channels, exe, timeout_s)
+                   for video_path, out_path in jobs]
+        for (video_path, _), future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+                _report(results[-1])
+            except RuntimeError as e:
+                print(e)
+            except Exception as e:
+                print(f"{video_path}: {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - t0
+
+    video_MB = sum(res["video_MB"] for res in results)
+    print(f"Total: {len(results)} files, {video_MB:.1f} MB in {elapsed:.2f} s ({video_MB / max(elapsed, 1e-9):.1f} MB/s)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert .webm video to .wav audio file")
+    parser.add_argument("recording_id", nargs="?", help="Recording DB id")
+    parser.add_argument("uID", nargs="?", help="User id, for example: 66001")
+    parser.add_argument("date", nargs="?", help="Date, for example: 2025-12-11")
+    parser.add_argument("sID", nargs="?", help="Recording id, for example: S1")
+    parser.add_argument("--all", nargs="?", const=data_path, metavar="DIR",
+                        help=f"Convert every .webm under DIR (default {data_path})")
+    parser.add_argument("--workers", type=int, default=None, help="Files converted in parallel (default: number of CPUs)")
+    parser.add_argument("--copy", action="store_true", help="Copy the audio stream into .mka instead of decoding to .wav")
+    parser.add_argument("--rate", type=int, default=None, help="Resample the .wav to this rate in Hz")
+    parser.add_argument("--mono", action="store_true", help="Downmix the .wav to one channel")
+    parser.add_argument("--force", action="store_true", help="Convert also videos whose audio file is up to date")
+    parser.add_argument("--timeout", type=float, default=FFMPEG_TIMEOUT_S,
+                        help=f"Seconds before a stuck ffmpeg is killed (default {FFMPEG_TIMEOUT_S})")
+    args = parser.parse_args()
+
+    if args.all:
+        videos = find_videos(args.all)
+    elif None in (args.uID, args.date, args.sID):
+        parser.error("uID, date and sID are required unless --all is given")
+    else:
+        video_dir = f"./Data/{args.uID}/{args.date}/{args.sID}"
+        videos = find_videos(video_dir)
+    if not videos:
+        print(f"No .webm file found in {args.all or video_dir}")
+        return
+
+    extract_audio(videos, target="copy" if args.copy else "wav", n_workers=args.workers, force=args.force,
+                  sample_rate=args.rate, channels=1 if args.mono else None, timeout_s=args.timeout)
+
+if __name__ == "__main__":
+    main()
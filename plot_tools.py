@@ -0,0 +1,31 @@
+"""
+Plotting helpers shared by the synthetic-signal plots
+(signal_generation_tools.plot_sigs) and the sensor plots of data-import.py;
+numpy only, so importing them costs no scipy or pandas.
+"""
+import numpy as np
+
+
+def minmax_downsample(t, y, max_points):
+    """
+    Reduce a trace to about max_points samples for plotting: the samples are
+    split into max_points // 2 equal buckets (one per pixel column when
+    max_points is twice the axes width) and each keeps its min and max in
+    time order, so spikes stay visible. Short traces are returned unchanged.
+    """
+    t, y = np.asarray(t), np.asarray(y)
+    n = len(y)
+    if n <= max_points or max_points < 2:
+        return t, y
+
+    k = -(-n // (max_points // 2))      # samples per bucket
+    n_buckets = -(-n // k)
+    buckets = np.pad(y, (0, n_buckets * k - n), mode="edge").reshape(n_buckets, k)
+    i_min, i_max = buckets.argmin(axis=1), buckets.argmax(axis=1)
+    idx = np.sort(np.stack([i_min, i_max], axis=1), axis=1)
+    idx = np.minimum(idx + k * np.arange(n_buckets)[:, None], n - 1).ravel()
+    return t[idx], y[idx]
+
+
+def plot_width_px(ax):
+    return max(int(ax.bbox.width), 1)
@@ -0,0 +1,921 @@
+#%% Imports
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import signal_generation_tools as sgt
+import plot_tools as pt
+import signal_io_tools as sio
+import sensor_tools as st
+import audio_tools as at
+import supabase_stub
+import importlib
+from scipy.io import wavfile
+
+importlib.reload(pt)
+importlib.reload(sgt)
+importlib.reload(sio)
+importlib.reload(st)
+importlib.reload(at)
+importlib.reload(supabase_stub)
+
+
+def peak_mem_mb(fn, *args, **kwargs):
+    """
+    Peak traced memory of one call, in MB
+    """
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def timeit(fn, *args, repeat=1, **kwargs):
+    """
+    Best wall time of repeat calls, in seconds
+    """
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+#%% Settings
+f_0 = 20
+
+mu_std = [
+    [0.5, 0.1],
+    [0.0, 0.15],
+    [3.0, 0.2],
+    [0.0, 0.05],
+    [1.0, 0.1]
+]
+
+ar_params = [
+    sgt.ar_from_timescale(8, 20, 5),
+    sgt.ar_from_timescale(3, 20, 3),
+    sgt.ar_from_timescale(4, 20, 4),
+    sgt.ar_from_timescale(2, 20, 6),
+    sgt.ar_from_timescale(5, 20, 3)
+]
+
+
+#%% AR(p) generation: per-sample loop vs. lfilter
+# The loop at T=86400 takes a few minutes
+res = []
+for T in [300, 3600, 86400]:
+    t_loop = timeit(sgt.generate_signals_Ap, 5, f_0, T, mu_std, ar_params, method="loop")
+    t_filt = timeit(sgt.generate_signals_Ap, 5, f_0, T, mu_std, ar_params, method="lfilter", repeat=3)
+    res.append({"T": T, "loop_s": t_loop, "lfilter_s": t_filt, "speedup": t_loop / t_filt})
+print(pd.DataFrame(res))
+
+# Statistical agreement (the loop starts from zero, so drop its transient)
+T = 3600
+sigs_loop = sgt.generate_signals_Ap(5, f_0, T, mu_std, ar_params, method="loop")
+sigs_filt = sgt.generate_signals_Ap(5, f_0, T, mu_std, ar_params, method="lfilter")
+n_burn = max(sgt.ar_burn_in(a) for a in ar_params)
+sig_cols = [f"sig_{i+1}" for i in range(5)]
+print(pd.DataFrame({
+    "mean_loop": sigs_loop[sig_cols].iloc[n_burn:].mean(),
+    "mean_lfilter": sigs_filt[sig_cols].mean(),
+    "std_loop": sigs_loop[sig_cols].iloc[n_burn:].std(),
+    "std_lfilter": sigs_filt[sig_cols].std(),
+    "acf1_loop": [sigs_loop[c].iloc[n_burn:].autocorr(1) for c in sig_cols],
+    "acf1_lfilter": [sigs_filt[c].autocorr(1) for c in sig_cols],
+}))
+
+
+#%% Chunked generation: peak memory vs. one-shot
+def consume_chunks(*args, **kwargs):
+    for chunk in sgt.generate_signals_Ap_chunks(*args, **kwargs):
+        chunk.sig_1.sum()
+
+res = []
+for T in [3600, 86400]:
+    res.append({
+        "T": T,
+        "one_shot_MB": peak_mem_mb(sgt.generate_signals_Ap, 5, f_0, T, mu_std, ar_params),
+        "chunked_MB": peak_mem_mb(consume_chunks, 5, f_0, T, mu_std, ar_params, chunk_size=72_000),
+    })
+print(pd.DataFrame(res))
+
+
+#%% Event detection: per-hop .loc loop vs. strided windows
+event_defs = {
+    "eID_1": {"criteria": sgt.event_criteria_mean, "sigs": ["sig_1"], "params": {"thresh": 0.7, "mode": "gt"}},
+    "eID_2": {"criteria": sgt.event_criteria_std, "sigs": ["sig_2"], "params": {"thresh": 0.15}},
+    "eID_3": {"criteria": sgt.event_criteria_fft_band, "sigs": ["sig_4"], "params": {"f_0": 20, "band": (0.1, 0.4), "thresh": 0.01}},
+    "eID_4": {"criteria": sgt.event_criteria_peaks, "sigs": ["sig_3"], "params": {"min_peaks": 3}},
+    "eID_5": {"criteria": sgt.event_criteria_mean, "sigs": ["sig_1"], "params": {"thresh": 0.3, "mode": "lt"}}
+}
+
+res = []
+for T in [300, 3600, 86400]:
+    sigs_X_df = sgt.generate_signals_Ap(5, f_0, T, mu_std, ar_params)
+    t_loop = timeit(sgt.generate_events, sigs_X_df, f_0, 5, 3, event_defs, method="loop")
+    t_strided = timeit(sgt.generate_events, sigs_X_df, f_0, 5, 3, event_defs, method="strided")
+    same = sgt.generate_events(sigs_X_df, f_0, 5, 3, event_defs, method="loop").equals(
+        sgt.generate_events(sigs_X_df, f_0, 5, 3, event_defs, method="strided"))
+    res.append({"T": T, "loop_s": t_loop, "strided_s": t_strided, "speedup": t_loop / t_strided, "same": same})
+print(pd.DataFrame(res))
+
+
+#%% Criteria: batched vs. per-window adapter over the same windows
+sigs_X_df = sgt.generate_signals_Ap(5, f_0, 3600, mu_std, ar_params)
+windows = np.lib.stride_tricks.sliding_window_view(sigs_X_df.sig_3.to_numpy(), 5 * f_0 + 1)[::3 * f_0]
+
+res = []
+for name, edef in event_defs.items():
+    fn, params = edef["criteria"], edef["params"]
+    res.append({
+        "eID": name,
+        "criteria": fn.__name__,
+        "per_window_s": timeit(sgt.per_window(fn), windows, **params),
+        "batched_s": timeit(fn, windows, **params, repeat=3),
+    })
+print(pd.DataFrame(res))
+
+
+#%% Running-statistics criteria vs. full window reductions
+# Long windows with short hops are where O(hop) updates pay off (np.std over
+# all windows also materialises windows x samples, so T is kept moderate)
+sigs_X_df = sgt.generate_signals_Ap(5, f_0, 3600, mu_std, ar_params)
+x = sigs_X_df.sig_2.to_numpy()
+
+res = []
+for window_s, hop_len_s in [(5, 3), (60, 1), (300, 1)]:
+    win, hop = window_s * f_0, hop_len_s * f_0
+    windows = np.lib.stride_tricks.sliding_window_view(x, win + 1)[::hop]
+    for plain, run, params in [
+        (sgt.event_criteria_mean, sgt.event_criteria_running_mean, {"thresh": 0.0}),
+        (sgt.event_criteria_std, sgt.event_criteria_running_std, {"thresh": 0.15}),
+    ]:
+        res.append({
+            "window_s": window_s,
+            "hop_len_s": hop_len_s,
+            "criteria": plain.__name__,
+            "full_s": timeit(plain, windows, **params, repeat=3),
+            "running_s": timeit(run, windows, **params, hop=hop, repeat=3),
+            "agree": np.mean(plain(windows, **params) == run(windows, **params, hop=hop)),
+        })
+print(pd.DataFrame(res))
+
+
+#%% Online detection: per-push latency replaying the recorded accelerometer CSVs
+imu_defs = {
+    "move": {"criteria": sgt.event_criteria_running_std, "sigs": ["z"], "params": {"thresh": 0.5}},
+    "tilt": {"criteria": sgt.event_criteria_running_mean, "sigs": ["y"], "params": {"thresh": 9.0, "mode": "lt"}},
+    "shake": {"criteria": sgt.event_criteria_peaks, "sigs": ["x"], "params": {"min_peaks": 5}},
+}
+
+res = []
+for path in sorted(glob.glob("Data/*/*/*/sensor-data/accel_signal_data.csv")):
+    accel_df = pd.read_csv(path)
+    t = pd.to_datetime(accel_df.timestamp, format="ISO8601")
+    accel_df["time_s"] = (t - t.iloc[0]).dt.total_seconds()
+    imu_f_0 = round(len(accel_df) / accel_df.time_s.iloc[-1])
+    rows = accel_df[["x", "y", "z", "time_s"]].to_dict("records")
+
+    latency = []
+    n_events = 0
+    detector = sgt.OnlineEventDetector(imu_f_0, window_s=5, hop_len_s=1, event_defs=imu_defs)
+    for _ in range(20):
+        for row in rows:
+            t0 = time.perf_counter()
+            n_events += len(detector.push(row))
+            latency.append(time.perf_counter() - t0)
+
+    latency = np.array(latency) * 1e6
+    res.append({
+        "session": path.split("/sensor-data")[0],
+        "f_0": imu_f_0,
+        "samples": len(latency),
+        "events": n_events,
+        "p50_us": np.percentile(latency, 50),
+        "p99_us": np.percentile(latency, 99),
+        "max_us": latency.max(),
+    })
+print(pd.DataFrame(res))
+
+
+#%% Batch generation: throughput across worker counts
+batch_configs = [
+    {"name": "ar_p", "mu_std": mu_std, "ar_params": ar_params},
+    {"name": "ar_1", "mu_std": mu_std, "lag_s": [6, 3, 4, 2, 5]},
+]
+
+# The guard keeps spawned workers (Windows/macOS) from re-running this cell
+if __name__ == "__main__":
+    batch_dir = tempfile.mkdtemp() + "/"
+    res = []
+    for n_workers in [1, 2, 4, os.cpu_count()]:
+        t0 = time.perf_counter()
+        summary_df = sgt.generate_signals_batch(
+            batch_configs, n_seeds=8, out_dir=batch_dir, T=3600, n_workers=n_workers
+        )
+        elapsed = time.perf_counter() - t0
+        n_total = (summary_df.n_samples * summary_df.N).sum()
+        res.append({"n_workers": n_workers, "seconds": elapsed, "samples_per_s": n_total / elapsed})
+    print(pd.DataFrame(res))
+    shutil.rmtree(batch_dir)
+
+
+#%% Storage: write/read time and size per format
+# xlsx is only timed at the short T, openpyxl takes minutes beyond that
+bench_dir = tempfile.mkdtemp() + "/"
+
+res = []
+for T in [300, 3600]:
+    sigs_X_df = sgt.generate_signals_Ap(5, f_0, T, mu_std, ar_params)
+    for fmt in sio.FORMATS:
+        if fmt == "xlsx" and T > 300:
+            continue
+        base = f"{bench_dir}sigs_X_df_{T}"
+        res.append({
+            "T": T,
+            "format": fmt,
+            "write_s": timeit(sio.save_df, sigs_X_df, base, fmt),
+            "read_s": timeit(sio.load_df, base, fmt),
+            "MB": os.path.getsize(f"{base}.{fmt}") / 1e6,
+        })
+print(pd.DataFrame(res))
+shutil.rmtree(bench_dir)
+
+
+#%% Memory-mapped store: open + slice vs. loading the whole frame
+T = 3 * 86400
+store_dir = tempfile.mkdtemp() + "/"
+store_base = f"{store_dir}sigs_X_store"
+df_base = f"{store_dir}sigs_X_df_long"
+sio.write_store(store_base, sgt.generate_signals_Ap_chunks(5, f_0, T, mu_std, ar_params), n_rows=int(T * f_0), f_0=f_0)
+sio.save_df_chunks(sgt.generate_signals_Ap_chunks(5, f_0, T, mu_std, ar_params), df_base, int(T * f_0), "npy")
+
+def open_and_slice():
+    store = sio.SignalStore(store_base)
+    return store[100_000:100_600, ["sig_1", "sig_3"]]
+
+def load_and_slice():
+    sigs_X_df = sio.load_df(df_base)
+    return sigs_X_df[(sigs_X_df.time_s >= 100_000) & (sigs_X_df.time_s < 100_600)][["time_s", "sig_1", "sig_3"]]
+
+print(pd.DataFrame([{
+    "MB": os.path.getsize(store_base + ".npy") / 1e6,
+    "open_s": timeit(sio.SignalStore, store_base, repeat=3),
+    "open_slice_s": timeit(open_and_slice, repeat=3),
+    "load_slice_s": timeit(load_and_slice),
+    "peak_MB_store": peak_mem_mb(open_and_slice),
+    "peak_MB_load": peak_mem_mb(load_and_slice),
+}]))
+shutil.rmtree(store_dir)
+
+
+#%% Supabase fetch: single query vs. paginated, sequential vs. concurrent
+# Against a local stub PostgREST server with a 1000-row cap and 20 ms latency
+recording_id = "0565b6af-c324-47da-b684-458970d6e48c"
+os.environ["VITE_SUPABASE_PUBLISHABLE_KEY"] = supabase_stub.FAKE_KEY
+di = importlib.import_module("data-import")
+
+def start_stub(tables, **kwargs):
+    """
+    Stub server for tables, with data-import pointed at it (fresh client and
+    settings) and at an empty temporary Data/ tree; stop with stop_stub
+    """
+    stub = supabase_stub.StubServer(tables, **kwargs).start()
+    os.environ["VITE_SUPABASE_URL"] = stub.url
+    importlib.reload(di)
+    stub.data_dir = di.data_path = tempfile.mkdtemp() + "/"
+    di.watermark_db = di.data_path + "import_cache.sqlite"
+    return stub
+
+def stop_stub(stub):
+    stub.stop()
+    shutil.rmtree(stub.data_dir)
+
+stub = start_stub(supabase_stub.make_tables(recording_id, 20_000), max_rows=1000, latency_s=0.02)
+
+single = di.get_client().table("sensor_data").select("*").eq(
+    "sensor_type_id", di.SENSOR_TYPE_IDS["accelerometer"]).eq("recording_id", recording_id).execute().data
+print(f"single .select('*') query: {len(single)} of 20000 accelerometer rows")
+
+t0 = time.perf_counter()
+sequential = {name: di.fetch_sensor_data(recording_id, name) for name in di.SENSOR_TYPE_IDS}
+sequential["events"] = di.fetch_events(recording_id)
+t_seq = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+concurrent = di.fetch_recording(recording_id)
+t_conc = time.perf_counter() - t0
+
+n_rows = sum(len(rows) for rows in concurrent.values())
+print(pd.DataFrame([
+    {"mode": "paginated, sequential", "rows": sum(len(r) for r in sequential.values()), "seconds": t_seq, "rows_per_s": n_rows / t_seq},
+    {"mode": "paginated, concurrent", "rows": n_rows, "seconds": t_conc, "rows_per_s": n_rows / t_conc},
+]))
+stop_stub(stub)
+
+
+#%% Incremental import: full import vs. re-import with and without new rows
+stub = start_stub(supabase_stub.make_tables(recording_id, 20_000), max_rows=1000, latency_s=0.02)
+
+res = []
+for run in ["first import", "no new rows", "500 new rows", "late row, same timestamp"]:
+    if run == "500 new rows":
+        stub.tables = supabase_stub.make_tables(recording_id, 20_500)
+        stub._cache.clear()
+    if run == "late row, same timestamp":
+        # Reaches the server after the import, stamped like the last row
+        late = dict(stub.tables["sensor_data"][-1], id=10**9)
+        stub.tables["sensor_data"].append(late)
+        stub._cache.clear()
+    n_requests = stub.n_requests
+    t0 = time.perf_counter()
+    n_new = di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+    res.append({"run": run, "seconds": time.perf_counter() - t0, "requests": stub.n_requests - n_requests,
+                "new rows": sum(n_new.values())})
+print(pd.DataFrame(res))
+stop_stub(stub)
+
+
+#%% Column-projected fetch: bytes on the wire and parse time vs. select('*')
+# Replays the recorded session Data/66001/2025-12-11/S1 through the stub
+stub = start_stub(supabase_stub.tables_from_session(recording_id, "Data/66001/2025-12-11/S1"))
+
+res, parsed = [], {}
+for columns in ["*", None]:
+    for name in ["accelerometer", "relative_orientation"]:
+        bytes_sent = stub.bytes_sent
+        t0 = time.perf_counter()
+        rows = di.fetch_sensor_data(recording_id, name, columns=columns)
+        t_fetch = time.perf_counter() - t0
+        is_q = name == "relative_orientation"
+        t_parse = timeit(di.parse_signals_to_dataframe, rows, is_quaternion=is_q, repeat=3)
+        parsed[columns, name] = di.parse_signals_to_dataframe(rows, is_quaternion=is_q)
+        res.append({"select": columns or "projected", "sensor": name, "rows": len(rows),
+                    "kB": (stub.bytes_sent - bytes_sent) / 1e3, "fetch_s": t_fetch, "parse_s": t_parse})
+print(pd.DataFrame(res))
+for name in ["accelerometer", "relative_orientation"]:
+    pd.testing.assert_frame_equal(parsed["*", name], parsed[None, name])
+stop_stub(stub)
+
+
+#%% JSON parsing: per-row loop vs. column-wise bulk parser at 10k / 100k / 1M rows
+def parse_rows_loop(data, is_quaternion=False):
+    # The per-row parser parse_signals_to_dataframe replaced
+    records = []
+    for row in data:
+        signal_json = row.get("data")
+        if signal_json:
+            if isinstance(signal_json, dict):
+                signal = signal_json
+            else:
+                signal = json.loads(signal_json)
+            if is_quaternion:
+                quat = signal.get("quaternion", [0, 0, 0, 0])
+                records.append({
+                    "q0": quat[0],
+                    "q1": quat[1],
+                    "q2": quat[2],
+                    "q3": quat[3],
+                    "timestamp": row.get("timestamp")
+                })
+            else:
+                records.append({
+                    "x": signal.get("x", 0),
+                    "y": signal.get("y", 0),
+                    "z": signal.get("z", 0),
+                    "timestamp": row.get("timestamp")
+                })
+    return pd.DataFrame(records)
+
+def sensor_rows(n, is_quaternion, json_text=False, seed=0):
+    # Whole rows as select('*') returns them, one with null data and one with
+    # a null x among them
+    values = np.random.default_rng(seed).normal(size=(n, 4)).round(4).tolist()
+    ts = pd.date_range("2025-12-11 15:29:42", periods=n, freq="10ms", tz="UTC").strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+    if is_quaternion:
+        signals = [{"quaternion": v} for v in values]
+    else:
+        signals = [{"x": v[0], "y": v[1], "z": v[2]} for v in values]
+        signals[2]["x"] = None
+    signals[1] = None
+    if json_text:
+        signals = [signal and json.dumps(signal) for signal in signals]
+    return [{"timestamp": t, "data": signal} for t, signal in zip(ts, signals)]
+
+def project(rows, keys):
+    # The same rows through SENSOR_COLUMNS: data->key is null when data is
+    # null or has no key
+    return [{"timestamp": row["timestamp"], **{key: (row["data"] or {}).get(key) for key in keys}} for row in rows]
+
+res = []
+for n in [10_000, 100_000, 1_000_000]:
+    for shape in ["projected", "projected quaternion", "data dict", "json text"]:
+        # The loop parses the whole rows, as fetched before the projection
+        is_q = shape == "projected quaternion"
+        whole = sensor_rows(n, is_q, json_text=shape == "json text")
+        rows = project(whole, ["quaternion"] if is_q else ["x", "y", "z"]) if shape.startswith("projected") else whole
+        pd.testing.assert_frame_equal(parse_rows_loop(whole, is_q), di.parse_signals_to_dataframe(rows, is_q))
+        t_loop = timeit(parse_rows_loop, whole, is_q)
+        t_bulk = timeit(di.parse_signals_to_dataframe, rows, is_q)
+        res.append({"rows": n, "shape": shape, "loop_s": t_loop, "bulk_s": t_bulk, "speedup": t_loop / t_bulk})
+        del whole, rows
+print(pd.DataFrame(res))
+
+
+#%% Batch import: one process per session vs. import_sessions with a worker pool
+# Six stub recordings of 4 x 5000 rows, imported into a temporary Data/ tree
+sessions = pd.DataFrame({
+    "uID": ["66001", "66001", "66002", "66002", "66003", "66003"],
+    "Date": "2025-12-11",
+    "sID": ["S1", "S2"] * 3,
+    "DbRecordingID": [f"Database recording ID: 00000000-0000-0000-0000-00000000000{i}" for i in range(6)],
+})
+tables = {"sensor_data": [], "events": []}
+for text in sessions["DbRecordingID"]:
+    for table, rows in supabase_stub.make_tables(text.split(": ")[1], 5000).items():
+        tables[table] += rows
+stub = start_stub(tables, max_rows=1000, latency_s=0.02)
+
+def run_per_process(work_dir):
+    for _, row in di.read_sessions(work_dir + "registry.xlsx").iterrows():
+        subprocess.run([sys.executable, os.path.abspath("data-import.py"), row.recording_id, row.uID, row.date, row.sID],
+                       cwd=work_dir, check=True, capture_output=True)
+
+def run_batch(work_dir, n_workers, plots=True):
+    di.data_path = work_dir + "Data/"
+    di.watermark_db = di.data_path + "import_cache.sqlite"
+    return di.import_sessions(work_dir + "registry.xlsx", n_workers=n_workers, plots=plots)
+
+res, work_dirs = [], []
+for mode, n_workers in [("process per session", 1), ("batch", 1), ("batch", 4), ("batch, re-run", 4)]:
+    if mode != "batch, re-run":
+        work_dir = tempfile.mkdtemp() + "/"
+        work_dirs.append(work_dir)
+        sessions.to_excel(work_dir + "registry.xlsx", index=False)
+    n_requests = stub.n_requests
+    t0 = time.perf_counter()
+    if mode == "process per session":
+        run_per_process(work_dir)
+    else:
+        run_batch(work_dir, n_workers)
+    res.append({"mode": mode, "workers": n_workers, "seconds": time.perf_counter() - t0, "requests": stub.n_requests - n_requests})
+print(pd.DataFrame(res))
+stop_stub(stub)
+for work_dir in work_dirs:
+    shutil.rmtree(work_dir)
+
+
+#%% Plot stage: import without plots, parallel plot stage, up-to-date skip
+# Same six stub recordings as the batch import cell
+stub = start_stub(tables, max_rows=1000, latency_s=0.02)
+work_dir = tempfile.mkdtemp() + "/"
+sessions.to_excel(work_dir + "registry.xlsx", index=False)
+keys = list(di.read_sessions(work_dir + "registry.xlsx")[["uID", "date", "sID"]].itertuples(index=False))
+
+res = []
+t0 = time.perf_counter()
+run_batch(work_dir, n_workers=4, plots=False)
+res.append({"stage": "import (plots off)", "seconds": time.perf_counter() - t0, "pngs": 0})
+for stage, n_workers in [("plot stage", 1), ("plot stage", 4), ("plot stage, up to date", 4)]:
+    t0 = time.perf_counter()
+    pngs = di.plot_sessions(keys, n_workers=n_workers, force=stage == "plot stage")
+    res.append({"stage": f"{stage}, {n_workers} workers", "seconds": time.perf_counter() - t0, "pngs": len(pngs)})
+print(pd.DataFrame(res))
+
+# Figures are closed after saving, so repeated plotting does not pile them up
+df = pd.read_csv(di.plot_jobs(keys, force=True)[0][1])
+for _ in range(5):
+    di.plot_signals_from_dataframe(df, "check", work_dir + "check.png")
+print("open figures:", len(plt.get_fignums()))
+stop_stub(stub)
+shutil.rmtree(work_dir)
+
+
+#%% Plot rendering: every sample vs. min/max-per-pixel downsampling on long traces (100 Hz)
+def render_sigs(sigs_df, sigs_lst, downsample):
+    sgt.plot_sigs(sigs_df, None, (0, sigs_df.time_s.iloc[-1]), sigs_lst, downsample=downsample)
+    fig = plt.gcf()
+    fig.savefig(png)
+    plt.close(fig)
+
+png_dir = tempfile.mkdtemp()
+png = png_dir + "/plot.png"
+res = []
+for n in [100_000, 1_000_000, 4_000_000]:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n, 3)).cumsum(axis=0) / 100, columns=["x", "y", "z"])
+    df.loc[n // 3, "x"] += 50      # a one-sample spike has to stay visible
+    sigs_df = pd.DataFrame({"time_s": np.arange(n) / 100, "sig_1": df.x, "sig_2": df.y})
+    for downsample in [False, True]:
+        res.append({"samples": n, "plot": "sensor plot", "downsample": downsample,
+                    "seconds": timeit(di.plot_signals_from_dataframe, df, "bench", png, downsample=downsample),
+                    "png_kB": os.path.getsize(png) / 1e3})
+        res.append({"samples": n, "plot": "plot_sigs", "downsample": downsample,
+                    "seconds": timeit(render_sigs, sigs_df, ["sig_1", "sig_2"], downsample),
+                    "png_kB": os.path.getsize(png) / 1e3})
+    t, y = pt.minmax_downsample(df.index, df.x, 2000)
+    assert y.max() == df.x.max() and len(y) <= 2000
+print(pd.DataFrame(res))
+shutil.rmtree(png_dir)
+
+
+#%% Event overlay: per-event axvline loop vs. one vlines per axis
+def plot_sigs_loop(sigs_X_df, events_X_df, t_int, sigs_lst, events_lst):
+    # Previous plot_sigs overlay: mask per subplot, one axvline per event
+    fig, ax = plt.subplots(len(sigs_lst), 1, figsize=(12, 2.5 * len(sigs_lst)), sharex=True)
+    for i, sig in enumerate(sigs_lst):
+        df = sigs_X_df[(sigs_X_df.time_s >= t_int[0]) & (sigs_X_df.time_s <= t_int[1])]
+        ax[i].plot(*pt.minmax_downsample(df.time_s, df[sig], 2 * pt.plot_width_px(ax[i])), label=sig)
+        for _, ev in events_X_df[events_X_df.eID.isin(events_lst)].iterrows():
+            if t_int[0] <= ev.time_t <= t_int[1]:
+                ax[i].axvline(ev.time_t, linestyle="--", alpha=0.6)
+    plt.tight_layout()
+
+def render(plot_fn, *args, **kwargs):
+    plot_fn(*args, **kwargs)
+    fig = plt.gcf()
+    fig.savefig(png)
+    plt.close(fig)
+
+png_dir = tempfile.mkdtemp()
+png = png_dir + "/plot.png"
+sigs_df = sgt.generate_signals_Ap(5, f_0, 3600, mu_std, ar_params)
+sigs_lst = [c for c in sigs_df.columns if c.startswith("sig_")]
+res = []
+for n_events in [100, 1000, 5000]:
+    rng = np.random.default_rng(0)
+    events_df = pd.DataFrame({"eID": rng.choice(["eID_1", "eID_2"], n_events), "time_t": np.sort(rng.uniform(0, 3600, n_events))})
+    args = (sigs_df, events_df, (0, 3600), sigs_lst, ["eID_1", "eID_2"])
+    res.append({"events": n_events, "subplots": len(sigs_lst),
+                "loop_s": timeit(render, plot_sigs_loop, *args),
+                "vlines_s": timeit(render, sgt.plot_sigs, *args)})
+print(pd.DataFrame(res))
+shutil.rmtree(png_dir)
+
+
+#%% Sensor alignment: resample_streams vs. pandas union-reindex-interpolate
+def resample_pandas(streams, f_s):
+    # The usual ad hoc join: no gap masking, quaternions interpolated linearly
+    t_start = max(t[0] for t, _ in streams.values())
+    t_end = min(t[-1] for t, _ in streams.values())
+    grid = t_start + np.arange(int((t_end - t_start) * f_s) + 1) / f_s
+    cols = []
+    for sensor, (t, values) in streams.items():
+        df = pd.DataFrame(values, index=t).groupby(level=0).last()
+        df = df.reindex(df.index.union(grid)).interpolate("index").reindex(grid)
+        cols.append(df.add_prefix(sensor + "_"))
+    return pd.concat(cols, axis=1)
+
+def synthetic_streams(hours, rate_hz=8, seed=0):
+    rng = np.random.default_rng(seed)
+    streams = {}
+    for sensor, columns in st.SENSOR_COLUMNS.items():
+        n = int(hours * 3600 * rate_hz)
+        dt = rng.uniform(0.5, 1.5, n) / rate_hz
+        dt[rng.random(n) < 1e-3] += 5       # occasional dropouts
+        t = 1.765e9 + np.cumsum(dt)
+        values = rng.normal(size=(n, len(columns)))
+        if sensor in st.QUATERNION_SENSORS:
+            values /= np.linalg.norm(values, axis=1, keepdims=True)
+        streams[sensor] = (t, values)
+    return streams
+
+res = []
+for session_dir in sorted(glob.glob("Data/*/*/*")):
+    streams = st.load_session(session_dir)
+    aligned = st.resample_streams(streams, f_s=10)
+    res.append({"input": session_dir, "grid_rows": len(aligned), "masked": aligned["accel_x"].isna().mean(),
+                "seconds": timeit(st.resample_streams, streams, f_s=10, repeat=5),
+                "pandas_s": timeit(resample_pandas, streams, 10, repeat=5)})
+for hours in [1, 8, 24]:
+    streams = synthetic_streams(hours)
+    aligned = st.resample_streams(streams, f_s=10)
+    res.append({"input": f"synthetic {hours} h, 4 x 8 Hz", "grid_rows": len(aligned), "masked": aligned["accel_x"].isna().mean(),
+                "seconds": timeit(st.resample_streams, streams, f_s=10),
+                "pandas_s": timeit(resample_pandas, streams, 10)})
+print(pd.DataFrame(res))
+
+# Quaternions stay unit length, and the output feeds window detection directly
+q = aligned.filter(like="relative_orientation").dropna().to_numpy()
+print("max |q| - 1:", np.abs(np.linalg.norm(q, axis=1) - 1).max())
+aligned = st.resample_streams(st.load_session("Data/66001/2025-12-11/S1"), f_s=10)
+print(sgt.generate_events(aligned, 10, 5, 2, {
+    "eID_move": dict(criteria=sgt.event_criteria_std, sigs=["accel_x"], params=dict(thresh=1.0))
+}))
+
+
+#%% Event alignment: binary-search index and one-pass window dataset vs. per-event masks
+def event_index_loop(streams, events, pre_s, post_s):
+    # Per-event boolean mask over every stream
+    index = events.copy()
+    for sensor, (t, _) in streams.items():
+        ranges = []
+        for event_t in events["epoch_s"]:
+            hit = np.flatnonzero((t >= event_t - pre_s) & (t <= event_t + post_s))
+            ranges.append((hit[0], hit[-1] + 1) if len(hit) else (np.searchsorted(t, event_t), np.searchsorted(t, event_t)))
+        index[f"{sensor}_i0"], index[f"{sensor}_i1"] = np.array(ranges, dtype=int).reshape(-1, 2).T
+    return index
+
+def event_windows_loop(sigs_df, events, f_s, pre_s, post_s):
+    # One .loc time slice per event
+    t = sigs_df.time_s + sigs_df.attrs["t0_epoch_s"]
+    n_samples = int(round((pre_s + post_s) * f_s)) + 1
+    X = []
+    for event_t in events["epoch_s"]:
+        w = sigs_df.loc[(t >= event_t - pre_s - 1e-9) & (t <= event_t + post_s + 0.5 / f_s), sigs_df.columns[1:]]
+        if len(w) == n_samples:
+            X.append(w.to_numpy())
+    return np.array(X)
+
+# Labeled dataset from the recorded sessions
+X_all, labels_all = [], []
+for session_dir in sorted(glob.glob("Data/*/*/*")):
+    aligned = st.resample_streams(st.load_session(session_dir), f_s=10)
+    X, labels = st.event_windows(aligned, st.load_events(session_dir), f_s=10, pre_s=1.0, post_s=1.0)
+    X_all.append(X)
+    labels_all.append(labels.assign(session=session_dir))
+X_all, labels_all = np.concatenate(X_all), pd.concat(labels_all, ignore_index=True)
+print("windows:", X_all.shape)
+print(labels_all.groupby(["label", "complete"]).size().unstack(fill_value=0))
+
+# Scaling: a synthetic day of 4 x 8 Hz streams with thousands of events
+streams = synthetic_streams(24)
+aligned = st.resample_streams(streams, f_s=10)
+res = []
+for n_events in [100, 1000, 10_000]:
+    t0, t1 = aligned.attrs["t0_epoch_s"], aligned.attrs["t0_epoch_s"] + aligned.time_s.iloc[-1]
+    events = pd.DataFrame({"epoch_s": np.sort(np.random.default_rng(1).uniform(t0, t1, n_events))})
+    row = {"events": n_events,
+           "index_s": timeit(st.event_index, streams, events),
+           "windows_s": timeit(st.event_windows, aligned, events, 10)}
+    if n_events <= 1000:        # the loops take minutes beyond that
+        pd.testing.assert_frame_equal(st.event_index(streams, events), event_index_loop(streams, events, 1.0, 1.0), check_dtype=False)
+        row["index_loop_s"] = timeit(event_index_loop, streams, events, 1.0, 1.0)
+        row["windows_loop_s"] = timeit(event_windows_loop, aligned, events, 10, 1.0, 1.0)
+    res.append(row)
+print(pd.DataFrame(res))
+
+
+#%% Session bundle: sensors.npz vs. the four sensor CSVs of Data/66001
+def load_csvs(session_dir):
+    # What every consumer did so far: read and parse the ISO timestamps
+    frames = {}
+    for sensor in st.SENSOR_COLUMNS:
+        df = pd.read_csv(f"{session_dir}/sensor-data/{sensor}_signal_data.csv")
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+        frames[sensor] = df
+    return frames
+
+work_dir = tempfile.mkdtemp() + "/"
+shutil.copytree("Data/66001", work_dir + "66001")
+res = []
+for session_dir in sorted(glob.glob(work_dir + "66001/*/*")):
+    csv_bytes = sum(os.path.getsize(p) for p in glob.glob(session_dir + "/sensor-data/*.csv"))
+    bundle = st.bundle_from_csv(session_dir)
+    for sensor, df in st.load_bundle(session_dir).items():
+        csv = load_csvs(session_dir)[sensor]
+        assert (df.timestamp_us.to_numpy() == st.to_epoch_us(csv.timestamp)).all()
+        np.testing.assert_allclose(df[st.SENSOR_COLUMNS[sensor]], csv[st.SENSOR_COLUMNS[sensor]], rtol=1e-6)
+    res.append({"session": session_dir.split("66001/")[1], "csv_kB": csv_bytes / 1e3, "bundle_kB": os.path.getsize(bundle) / 1e3,
+                "csv_load_ms": 1e3 * timeit(load_csvs, session_dir, repeat=5),
+                "bundle_load_ms": 1e3 * timeit(st.load_bundle, session_dir, repeat=5)})
+print(pd.DataFrame(res))
+
+# Incremental imports keep the bundle in step with the CSVs
+stub = start_stub(supabase_stub.make_tables(recording_id, 5000), max_rows=1000)
+for n_rows in [5000, 5500]:
+    stub.tables = supabase_stub.make_tables(recording_id, n_rows)
+    stub._cache.clear()
+    di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+session_dir = di.data_path + "66001/2025-12-11/S1"
+print({sensor: (len(df), len(load_csvs(session_dir)[sensor])) for sensor, df in st.load_bundle(session_dir).items()})
+stop_stub(stub)
+shutil.rmtree(work_dir)
+
+
+#%% CLI start-up: lazy imports and client, python -X importtime as a regression check
+def startup_s(args, repeat=5):
+    return timeit(subprocess.run, [sys.executable] + args, capture_output=True, repeat=repeat)
+
+out = subprocess.run([sys.executable, "-X", "importtime", "data-import.py", "--help"], capture_output=True, text=True).stderr
+loaded = {line.split("|")[-1].strip() for line in out.splitlines() if line.startswith("import time:")}
+heavy = {"numpy", "pandas", "matplotlib", "supabase", "httpx", "scipy"}
+print("heavy modules loaded by data-import.py --help:", sorted(loaded & heavy))
+
+print(pd.DataFrame([
+    {"run": "python -c pass", "seconds": startup_s(["-c", "pass"])},
+    {"run": "data-import.py --help", "seconds": startup_s(["data-import.py", "--help"])},
+    {"run": "data-import.py (argument error)", "seconds": startup_s(["data-import.py"])},
+    {"run": "eager imports it used to pay", "seconds": startup_s(["-c", "import numpy, pandas, matplotlib.pyplot, httpx, supabase, scipy.signal"])},
+]))
+
+# One client and one connection pool for a whole batch run
+stub = start_stub(tables, max_rows=1000, latency_s=0.02)
+work_dir = tempfile.mkdtemp() + "/"
+sessions.to_excel(work_dir + "registry.xlsx", index=False)
+run_batch(work_dir, n_workers=4, plots=False)
+assert di.get_client() is di.get_client()
+print(f"{stub.n_requests} requests over {stub.n_connections} connections")
+stop_stub(stub)
+shutil.rmtree(work_dir)
+
+
+#%% Failure injection: retries with backoff, and resuming a failed 1M-row import
+# 1) Random 503s and dropped connections: the import still gets every row
+for fail_status in [503, None]:
+    stub = start_stub(supabase_stub.make_tables(recording_id, 20_000), max_rows=1000,
+                      fail_rate=0.1, fail_status=fail_status)
+    # After start_stub, which reloads data-import and its settings
+    di.RETRIES, di.BACKOFF_S = 4, 0.01
+    counts = di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+    print(f"fail_status={fail_status}: {stub.n_failed} of {stub.n_requests} requests failed and were retried, "
+          f"{sum(counts.values())} of {len(stub.tables['sensor_data']) + len(stub.tables['events'])} rows imported")
+    stop_stub(stub)
+
+# 2) An outage late in a 1M-row import: the rerun fetches only the missing pages
+stub = start_stub(supabase_stub.make_tables(recording_id, 250_000), max_rows=1000)
+di.RETRIES, di.BACKOFF_S = 2, 0.01
+stub.fail_from = 900
+try:
+    di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+except Exception as e:
+    print("import failed with", getattr(e, "code", None) or type(e).__name__)
+n_pages = len(glob.glob(di.data_path + "66001/2025-12-11/S1/.checkpoints/*/page_*.json"))
+stub.fail_from = None
+n_requests = stub.n_requests
+counts = di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+print(f"{n_pages} pages checkpointed before the outage; the rerun made {stub.n_requests - n_requests} requests "
+      f"for {sum(counts.values())} rows (a fresh import needs ~{len(stub.tables['sensor_data']) // 1000 + 6})")
+stop_stub(stub)
+
+#%% Streaming import: peak memory of buffered vs. page-by-page import, up to a 5M-row recording
+# Each import runs in a fresh process; its peak RSS (Linux /proc) is the memory profile
+IMPORT_RUN = """
+import importlib, json, os, shutil, sys, tempfile, time
+import supabase_stub, sensor_tools as st
+mode, n_rows, recording_id = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+
+def status_MB(field):
+    # VmHWM is the peak resident set size, VmRSS the current one
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":")) / 1024
+
+tables = {"sensor_data": supabase_stub.SyntheticSensorData(recording_id, n_rows),
+          "events": supabase_stub.make_tables(recording_id, 0)["events"]}
+stub = supabase_stub.StubServer(tables, max_rows=1000).start()
+os.environ["VITE_SUPABASE_URL"] = stub.url
+os.environ["VITE_SUPABASE_PUBLISHABLE_KEY"] = supabase_stub.FAKE_KEY
+di = importlib.import_module("data-import")
+di.data_path = tempfile.mkdtemp() + "/"
+di.watermark_db = di.data_path + "import_cache.sqlite"
+session_dir = di.data_path + "66001/2025-12-11/S1"
+os.makedirs(session_dir + "/sensor-data")
+start_MB = status_MB("VmRSS")
+
+t0 = time.perf_counter()
+if mode == "buffered":
+    # The import before streaming: every stream in memory, then parsed and written
+    fetched = di.fetch_recording(recording_id)
+    records = {}
+    for name, (prefix, _) in di.SENSOR_OUTPUTS.items():
+        df = di.parse_signals_to_dataframe(fetched[name], is_quaternion=name == "relative_orientation")
+        df.to_csv(f"{session_dir}/sensor-data/{prefix}_signal_data.csv", index=False)
+        records[prefix] = st.sensor_records(df, prefix)
+    st.write_bundle(session_dir, records)
+else:
+    di.import_recording(recording_id, "66001", "2025-12-11", "S1")
+seconds = time.perf_counter() - t0
+peak_MB = status_MB("VmHWM")
+
+# Checked after taking the peak: loading the bundle needs the whole recording
+assert all(len(df) == n_rows for df in st.load_bundle(session_dir).values())
+shutil.rmtree(di.data_path)
+print(json.dumps({"seconds": seconds, "start_MB": start_MB, "peak_MB": peak_MB}))
+"""
+
+if not os.path.exists("/proc/self/status"):
+    print("no /proc/self/status to read the peak RSS from - skipping")
+else:
+    res = []
+    for mode, n_total in [("buffered", 250_000), ("buffered", 1_000_000),
+                          ("streaming", 250_000), ("streaming", 1_000_000), ("streaming", 5_000_000)]:
+        out = subprocess.run([sys.executable, "-c", IMPORT_RUN, mode, str(n_total // 4), recording_id],
+                             capture_output=True, text=True, check=True).stdout
+        res.append({"mode": mode, "rows": n_total, **json.loads(out.splitlines()[-1])})
+        print(res[-1])
+
+    # Peak memory of the streaming import stays flat with the recording length
+    print(pd.DataFrame(res))
+
+#%% Audio extraction: moviepy one by one vs. ffmpeg in a process pool, up-to-date skip
+ea = importlib.import_module("extract-audio")
+try:
+    exe = ea.ffmpeg_exe()
+except FileNotFoundError as e:
+    exe = None
+    print(e, "- skipping")
+
+if exe:
+    # 8 synthetic 2-minute sessions: 48 kHz Opus audio and a small VP8 video track
+    work_dir = tempfile.mkdtemp() + "/"
+    for i in range(8):
+        session_dir = f"{work_dir}66001/2025-12-11/S{i + 1}"
+        os.makedirs(session_dir)
+        subprocess.run([exe, "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000:duration=120",
+                        "-f", "lavfi", "-i", "color=size=160x120:rate=10:duration=120",
+                        "-c:a", "libopus", "-c:v", "libvpx", "-deadline", "realtime", "-shortest",
+                        f"{session_dir}/recording.webm"], check=True)
+    videos = ea.find_videos(work_dir)
+
+    res = []
+    try:
+        from moviepy import AudioFileClip
+        t0 = time.perf_counter()
+        for video_path in videos:
+            AudioFileClip(video_path).write_audiofile(os.path.splitext(video_path)[0] + ".moviepy.wav", logger=None)
+        res.append({"run": "moviepy, one by one", "seconds": time.perf_counter() - t0})
+    except ImportError:
+        print("moviepy not installed, no baseline")
+
+    for run, kwargs in [("ffmpeg wav, 1 worker", {"n_workers": 1, "force": True}),
+                        ("ffmpeg wav, pool", {"force": True}),
+                        ("ffmpeg stream copy, pool", {"target": "copy", "force": True}),
+                        ("all up to date", {})]:
+        t0 = time.perf_counter()
+        ea.extract_audio(videos, **kwargs)
+        res.append({"run": run, "seconds": time.perf_counter() - t0})
+    print(pd.DataFrame(res))
+    shutil.rmtree(work_dir)
+
+#%% Audio features: whole-file per-window loop vs. memory-mapped blocks, and alignment to the sensor grid
+def audio_features_loop(path, audio_t0_epoch_s, f_s=10):
+    # The straightforward way: whole WAV in memory, one window at a time
+    rate, data = wavfile.read(path)
+    x = data.astype(np.float32) / 32768
+    win = int(round(rate / f_s))
+    rows = []
+    for k in range(int(np.floor(len(x) / rate * f_s + 1e-9)) + 1):
+        s = int(round(k * rate / f_s)) - win // 2
+        if s < 0 or s + win > len(x):
+            rows.append({})
+        else:
+            rows.append({name: v[0] for name, v in at.window_features(x[None, s:s + win], rate).items()})
+    return pd.DataFrame(rows)
+
+# 30 minutes of 16 kHz mono noise with a 1 kHz tone burst every 10 s
+work_dir = tempfile.mkdtemp() + "/"
+rate = 16_000
+rng = np.random.default_rng(0)
+x = 0.01 * rng.normal(size=30 * 60 * rate)
+t = np.arange(rate // 2) / rate
+for start in range(0, len(x) - rate, 10 * rate):
+    x[start:start + len(t)] += 0.5 * np.sin(2 * np.pi * 1000 * t)
+wav_path = work_dir + "long.wav"
+wavfile.write(wav_path, rate, (x * 32767).astype(np.int16))
+del x
+
+res = []
+for run, fn in [("per-window loop", audio_features_loop), ("mmap blocks", at.audio_features)]:
+    t0 = time.perf_counter()
+    tracemalloc.start()
+    out = fn(wav_path, 0.0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    res.append({"run": run, "seconds": time.perf_counter() - t0, "peak_MB": peak / 1e6, "rows": len(out)})
+    if run == "per-window loop":
+        loop_df = out
+assert np.allclose(loop_df.to_numpy(), out.drop(columns="time_s").to_numpy(), rtol=1e-4, atol=1e-9, equal_nan=True)
+print(pd.DataFrame(res))
+
+# Session S1: a tone at every annotated event (offset_ms into the video), features
+# joined onto the 10 Hz sensor grid and cut into event windows with the sensor columns
+session_dir = "Data/66001/2025-12-11/S1"
+events = st.load_events(session_dir)
+sigs_X_df = st.resample_streams(st.load_session(session_dir), f_s=10)
+x = 0.01 * rng.normal(size=int((events["offset_ms"].max() / 1000 + 5) * rate))
+for offset_s in events["offset_ms"] / 1000:
+    x[int(offset_s * rate):int(offset_s * rate) + len(t) // 2] += 0.5 * np.sin(2 * np.pi * 1000 * t[:len(t) // 2])
+wavfile.write(work_dir + "session.wav", rate, (x * 32767).astype(np.int16))
+
+audio_df = at.audio_features(work_dir + "session.wav", at.audio_start(events), f_s=10,
+                             t_start=sigs_X_df.attrs["t0_epoch_s"], n=len(sigs_X_df))
+sigs_X_df = sigs_X_df.join(audio_df.drop(columns="time_s"))
+X, labels = st.event_windows(sigs_X_df, events, f_s=10, pre_s=0.5, post_s=1.0,
+                             columns=["accel_x", "audio_rms", "audio_band_300_3000"])
+# The tone shows up in the event windows right at the event (sample 5 of 16)
+print(f"{len(labels)} event windows, mean 300-3000 Hz power per sample:")
+print(np.nanmean(X[:, :, 2], axis=0).round(4))
+shutil.rmtree(work_dir)
+
+# %%
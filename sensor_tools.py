@@ -0,0 +1,406 @@
+"""
+Tools for the sensor sessions imported by data-import.py into
+Data/{uID}/{date}/{sID}: loading the per-sensor data and aligning the
+irregularly sampled streams on one fixed-rate time grid.
+
+Next to the CSVs each session has sensor-data/sensors.npz, one structured
+array per sensor with int64 epoch-microsecond timestamps and float32
+channels, which loads without parsing any text.
+
+    streams = load_session("Data/66001/2025-12-11/S1")
+    sigs_X_df = resample_streams(streams, f_s=10)
+    events_X_df = sgt.generate_events(sigs_X_df, f_0=10, event_defs=...)
+"""
+import os
+import shutil
+import threading
+import zipfile
+import numpy as np
+import pandas as pd
+
+
+SENSOR_COLUMNS = {
+    "accel": ["x", "y", "z"],
+    "gyro": ["x", "y", "z"],
+    "linear": ["x", "y", "z"],
+    "relative_orientation": ["q0", "q1", "q2", "q3"],
+}
+
+QUATERNION_SENSORS = ["relative_orientation"]
+
+BUNDLE_NAME = "sensors.npz"
+
+
+def to_epoch_s(timestamps):
+    """
+    ISO 8601 timestamps -> float64 seconds since the Unix epoch
+    """
+    ts = pd.to_datetime(pd.Series(timestamps), format="ISO8601", utc=True)
+    return ((ts - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy()
+
+
+def to_epoch_us(timestamps):
+    """
+    ISO 8601 timestamps -> int64 microseconds since the Unix epoch
+    """
+    ts = pd.to_datetime(pd.Series(timestamps), format="ISO8601", utc=True)
+    return ts.dt.as_unit("us").astype("int64").to_numpy()
+
+
+def sensor_records(df, sensor):
+    """
+    Sensor frame (channels + ISO timestamp, as written by data-import.py)
+    -> structured array with timestamp_us (int64) and float32 channels
+    """
+    columns = SENSOR_COLUMNS[sensor]
+    rec = np.empty(len(df), dtype=[("timestamp_us", "<i8")] + [(c, "<f4") for c in columns])
+    rec["timestamp_us"] = to_epoch_us(df["timestamp"])
+    for c in columns:
+        rec[c] = df[c].to_numpy()
+    return rec
+
+
+def _bundle_path(session_dir):
+    return f"{session_dir}/sensor-data/{BUNDLE_NAME}"
+
+
+def _read_header(src):
+    # Shape of an .npy member, leaving src at the start of the data
+    version = np.lib.format.read_magic(src)
+    if version == (1, 0):
+        shape, _, _ = np.lib.format.read_array_header_1_0(src)
+    else:
+        shape, _, _ = np.lib.format.read_array_header_2_0(src)
+    return shape
+
+
+def _copy_member_data(path, sensor, out):
+    """
+    Stream the rows of one array in the bundle into out; returns the count
+    """
+    with zipfile.ZipFile(path) as zf, zf.open(sensor + ".npy") as src:
+        shape = _read_header(src)
+        shutil.copyfileobj(src, out)
+    return shape[0]
+
+
+def bundle_rows(session_dir):
+    """
+    dict sensor -> number of rows in the session bundle, read from the array
+    headers only; empty if there is no bundle
+    """
+    path = _bundle_path(session_dir)
+    if not os.path.exists(path):
+        return {}
+    rows = {}
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            with zf.open(name) as src:
+                rows[name[:-len(".npy")]] = _read_header(src)[0]
+    return rows
+
+
+class BundleWriter:
+    """
+    Build the session bundle page by page with bounded memory:
+
+        with BundleWriter(session_dir, append=["accel"]) as bundle:
+            for df in pages:
+                bundle.write("accel", sensor_records(df, "accel"))
+
+    Records go to one raw file per sensor and are zipped into sensors.npz
+    on close. Sensors listed in append continue the rows already in the
+    bundle, the others replace theirs, and sensors that get no records are
+    kept. The bundle is swapped in only by close(); abort() (or an error in
+    the with block) leaves the old one untouched.
+    """
+
+    def __init__(self, session_dir, append=()):
+        self.session_dir = session_dir
+        self.path = _bundle_path(session_dir)
+        self.append = set(append)
+        # Appending without a bundle: only the new rows would be at hand, so
+        # close() rebuilds it from the (by then complete) CSVs instead
+        self.from_csv = bool(self.append) and not os.path.exists(self.path)
+        self.sensors = set()
+        self._files, self._counts, self._dtypes = {}, {}, {}
+        self._lock = threading.Lock()
+
+    def _raw(self, sensor):
+        return f"{self.path}.{sensor}.raw"
+
+    def write(self, sensor, records):
+        self.sensors.add(sensor)
+        if self.from_csv:
+            return
+        with self._lock:
+            if sensor not in self._files:
+                self._files[sensor] = open(self._raw(sensor), "wb")
+                self._dtypes[sensor] = records.dtype
+                self._counts[sensor] = 0
+                if sensor in self.append and os.path.exists(self.path):
+                    self._counts[sensor] = _copy_member_data(self.path, sensor, self._files[sensor])
+            records.tofile(self._files[sensor])
+            self._counts[sensor] += len(records)
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+
+    def abort(self):
+        self._close_files()
+        for sensor in self._files:
+            os.remove(self._raw(sensor))
+
+    def close(self):
+        # Nothing written: the bundle stays as it is
+        if not self.sensors:
+            return self.path
+        if self.from_csv:
+            return bundle_from_csv(self.session_dir)
+        self._close_files()
+
+        tmp = self.path + ".tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as zout:
+            if os.path.exists(self.path):
+                with zipfile.ZipFile(self.path) as zin:
+                    for name in zin.namelist():
+                        if name[:-len(".npy")] not in self._files:
+                            with zin.open(name) as src, zout.open(name, "w", force_zip64=True) as dst:
+                                shutil.copyfileobj(src, dst)
+            for sensor in self._files:
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(self._dtypes[sensor]),
+                    "fortran_order": False,
+                    "shape": (self._counts[sensor],),
+                }
+                with zout.open(sensor + ".npy", "w", force_zip64=True) as dst, open(self._raw(sensor), "rb") as src:
+                    np.lib.format.write_array_header_1_0(dst, header)
+                    shutil.copyfileobj(src, dst)
+                os.remove(self._raw(sensor))
+        # Readers never see a half-written bundle
+        os.replace(tmp, self.path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_bundle(session_dir, records, append=()):
+    """
+    Store dict sensor -> records (sensor_records) in the session bundle,
+    with the append semantics of BundleWriter
+    """
+    bundle = BundleWriter(session_dir, append)
+    for sensor, rec in records.items():
+        bundle.write(sensor, rec)
+    return bundle.close()
+
+
+def bundle_from_csv(session_dir, chunksize=100_000):
+    """
+    (Re)build the bundle of a session from its sensor CSVs, chunk by chunk
+    """
+    bundle = BundleWriter(session_dir)
+    for sensor in SENSOR_COLUMNS:
+        path = f"{session_dir}/sensor-data/{sensor}_signal_data.csv"
+        if os.path.exists(path):
+            for chunk in pd.read_csv(path, chunksize=chunksize):
+                bundle.write(sensor, sensor_records(chunk, sensor))
+    return bundle.close()
+
+
+def load_bundle(session_dir):
+    """
+    dict sensor -> DataFrame (timestamp_us, float32 channels) from the
+    session bundle
+    """
+    with np.load(_bundle_path(session_dir)) as bundle:
+        return {sensor: pd.DataFrame(bundle[sensor]) for sensor in bundle.files}
+
+
+def read_sensor_csv(path, columns):
+    """
+    One sensor CSV -> (t, values): epoch seconds in ascending order and the
+    matching (n, len(columns)) float64 values
+    """
+    df = pd.read_csv(path)
+    t = to_epoch_s(df["timestamp"])
+    order = np.argsort(t, kind="stable")
+    return t[order], df[columns].to_numpy(dtype=np.float64)[order]
+
+
+def load_session(session_dir):
+    """
+    dict sensor -> (t, values) of a session: from the bundle when there is
+    one, else from the sensor CSVs
+    """
+    streams = {}
+    if os.path.exists(_bundle_path(session_dir)):
+        for sensor, df in load_bundle(session_dir).items():
+            t = df["timestamp_us"].to_numpy() / 1e6
+            order = np.argsort(t, kind="stable")
+            streams[sensor] = (t[order], df[SENSOR_COLUMNS[sensor]].to_numpy(dtype=np.float64)[order])
+        return streams
+
+    for sensor, columns in SENSOR_COLUMNS.items():
+        path = f"{session_dir}/sensor-data/{sensor}_signal_data.csv"
+        if os.path.exists(path):
+            streams[sensor] = read_sensor_csv(path, columns)
+    return streams
+
+
+def _neighbours(t, grid, max_gap_s):
+    """
+    For each grid point the bracketing samples t[i0] <= g <= t[i1] (one
+    binary search of the sorted grid into the sorted stream), the
+    interpolation weight, and whether the point is covered: inside the
+    stream and on a sample or not inside a gap longer than max_gap_s
+    """
+    n = len(t)
+    i1 = np.clip(np.searchsorted(t, grid, side="right"), 1, n - 1)
+    i0 = i1 - 1
+    dt = t[i1] - t[i0]
+    w = np.divide(grid - t[i0], dt, out=np.zeros_like(grid), where=dt > 0)
+    on_sample = (grid == t[i0]) | (grid == t[i1])
+    valid = (grid >= t[0]) & (grid <= t[-1]) & ((dt <= max_gap_s) | on_sample)
+    return i0, i1, np.clip(w, 0, 1), valid
+
+
+def slerp(q0, q1, w):
+    """
+    Spherical linear interpolation between rows of unit quaternions q0 and
+    q1 (n, 4) at fractions w (n,), taking the shorter arc
+    """
+    q0 = q0 / np.linalg.norm(q0, axis=1, keepdims=True)
+    q1 = q1 / np.linalg.norm(q1, axis=1, keepdims=True)
+    dot = np.sum(q0 * q1, axis=1)
+    q1 = np.where(dot[:, None] < 0, -q1, q1)
+    theta = np.arccos(np.clip(np.abs(dot), 0, 1))
+    sin_theta = np.sin(theta)
+
+    # Nearly parallel quaternions: fall back to linear interpolation
+    near = sin_theta < 1e-6
+    safe = np.where(near, 1, sin_theta)
+    a = np.where(near, 1 - w, np.sin((1 - w) * theta) / safe)
+    b = np.where(near, w, np.sin(w * theta) / safe)
+    q = a[:, None] * q0 + b[:, None] * q1
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def interp_stream(t, values, grid, max_gap_s=1.0, quaternion=False):
+    """
+    Values of one stream at the grid times: linear interpolation, or SLERP
+    for quaternions; NaN outside the stream and inside gaps > max_gap_s
+    """
+    out = np.full((len(grid), values.shape[1]), np.nan)
+    if len(t) < 2:
+        return out
+    i0, i1, w, valid = _neighbours(t, grid, max_gap_s)
+    i0, i1, w = i0[valid], i1[valid], w[valid]
+    if quaternion:
+        out[valid] = slerp(values[i0], values[i1], w)
+    else:
+        out[valid] = values[i0] + w[:, None] * (values[i1] - values[i0])
+    return out
+
+
+def resample_streams(streams, f_s=10, max_gap_s=1.0, t_start=None, t_end=None):
+    """
+    Merge sensor streams onto one fixed-rate grid.
+
+    streams: dict sensor -> (t, values), as from load_session
+    f_s: grid rate in Hz
+    max_gap_s: grid points inside a longer gap between two samples are NaN
+    t_start, t_end: grid span in epoch seconds, by default the time all
+                    streams overlap
+    Returns a DataFrame with time_s (seconds from t_start) and one column per
+    sensor axis (accel_x, ..., relative_orientation_q3), ready for
+    sgt.generate_events with f_0=f_s. The absolute start is kept in
+    df.attrs["t0_epoch_s"].
+    """
+    if t_start is None:
+        t_start = max(t[0] for t, _ in streams.values())
+    if t_end is None:
+        t_end = min(t[-1] for t, _ in streams.values())
+    n = max(int(np.floor((t_end - t_start) * f_s + 1e-9)) + 1, 0)
+    grid = t_start + np.arange(n) / f_s
+
+    cols = {"time_s": grid - t_start}
+    for sensor, (t, values) in streams.items():
+        out = interp_stream(t, values, grid, max_gap_s, quaternion=sensor in QUATERNION_SENSORS)
+        for k, col in enumerate(SENSOR_COLUMNS[sensor]):
+            cols[f"{sensor}_{col}"] = out[:, k]
+
+    sigs_df = pd.DataFrame(cols)
+    sigs_df.attrs["t0_epoch_s"] = t_start
+    return sigs_df
+
+
+def load_events(session_dir):
+    """
+    events.csv of a session with the event time in epoch seconds and the
+    e_id / label pulled out of the event_codes text; sorted by time
+    """
+    events = pd.read_csv(f"{session_dir}/events.csv")
+    codes = events["event_codes"].astype(str)
+    events["e_id"] = codes.str.extract(r"'e_id':\s*'([^']*)'", expand=False)
+    events["label"] = codes.str.extract(r"'e_description_butt':\s*'([^']*)'", expand=False)
+    events["epoch_s"] = to_epoch_s(events["timestamp"])
+    return events.sort_values("epoch_s", kind="stable").reset_index(drop=True)
+
+
+def event_ranges(t, event_t, pre_s=1.0, post_s=1.0):
+    """
+    Sample ranges [i0, i1) of a sorted stream t holding the samples with
+    event_t - pre_s <= t <= event_t + post_s, for all events at once
+    """
+    i0 = np.searchsorted(t, np.asarray(event_t) - pre_s, side="left")
+    i1 = np.searchsorted(t, np.asarray(event_t) + post_s, side="right")
+    return i0, i1
+
+
+def event_index(streams, events, pre_s=1.0, post_s=1.0):
+    """
+    Alignment index of annotated events to the raw sensor streams: the
+    events frame plus {sensor}_i0 / {sensor}_i1 sample ranges per stream,
+    so values[i0:i1] are the samples around the event
+    """
+    index = events.copy()
+    for sensor, (t, _) in streams.items():
+        index[f"{sensor}_i0"], index[f"{sensor}_i1"] = event_ranges(t, events["epoch_s"], pre_s, post_s)
+    return index
+
+
+def event_windows(sigs_df, events, f_s, pre_s=1.0, post_s=1.0, columns=None):
+    """
+    Labeled window dataset from a grid made by resample_streams: one
+    fixed-length window per event, gathered for all events with one index.
+
+    Returns X (n_events, n_samples, n_columns) and a frame with the event
+    rows (e_id, label, epoch_s, ...), the window's first grid row i0 and
+    complete (False when the window has masked samples). Events whose
+    window does not fit on the grid are dropped. The grid start is read
+    from sigs_df.attrs["t0_epoch_s"]; a frame without it (pandas drops attrs
+    in some operations) raises KeyError rather than being taken as epoch 0.
+    """
+    columns = columns or [c for c in sigs_df.columns if c != "time_s"]
+    values = sigs_df[columns].to_numpy(dtype=np.float64)
+    n_samples = int(round((pre_s + post_s) * f_s)) + 1
+
+    # The grid is fixed-rate: the window start is arithmetic, not a search
+    t0 = sigs_df.attrs["t0_epoch_s"]
+    i0 = np.ceil((events["epoch_s"].to_numpy() - pre_s - t0) * f_s - 1e-9).astype(int)
+    fits = (i0 >= 0) & (i0 + n_samples <= len(values))
+
+    X = values[i0[fits, None] + np.arange(n_samples)]
+    labels = events[fits].reset_index(drop=True)
+    labels["i0"] = i0[fits]
+    labels["complete"] = ~np.isnan(X).any(axis=(1, 2))
+    return X, labels
@@ -1,175 +1,631 @@
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from scipy import signal, stats
-
-
-def ar_from_timescale(tau_s, f_0, p):
-    """
-    Generate stable AR(p) coefficients with decay time ~tau_s
-    """
-    phi = np.exp(-1 / (f_0 * tau_s))
-    a = phi ** np.arange(1, p + 1)
-    a /= np.sum(a) * 1.1
-    return a.tolist()
-
-
-def generate_signals_A1(
-    M=5,
-    N=5,
-    f_0=20,
-    T=300,
-    lag_s=None,
-    mu_std=None,
-    arma_params=None,
-    seed=42
-):
-    """
-    Returns sigs_X_df
-    """
-    rng = np.random.default_rng(seed)
-    n_samples = int(T * f_0)
-    time_s = np.arange(n_samples) / f_0
-
-    sigs = {}
-
-    for i in range(N):
-        mu, std = mu_std[i]
-        tau = lag_s[i]
-
-        # AR(1) coefficient from autocorrelation time
-        phi = np.exp(-1 / (f_0 * tau))
-
-        noise = rng.normal(0, std * np.sqrt(1 - phi**2), size=n_samples)
-        x = np.zeros(n_samples)
-
-        for t in range(1, n_samples):
-            x[t] = phi * x[t - 1] + noise[t]
-
-        x = x + mu
-        sigs[f"sig_{i+1}"] = x
-
-    sigs_X_df = pd.DataFrame({"time_s": time_s, **sigs})
-    return sigs_X_df
-
-def generate_signals_Ap(
-    N,
-    f_0,
-    T,
-    mu_std,
-    ar_params,
-    seed=42
-):
-    """
-    Generate N stationary AR(p) time series.
-    
-    ar_params: list of AR coefficient lists, one per signal
-    """
-    rng = np.random.default_rng(seed)
-    n_samples = int(T * f_0)
-    time_s = np.arange(n_samples) / f_0
-
-    sigs = {}
-
-    for i in range(N):
-        mu, std = mu_std[i]
-        a = np.array(ar_params[i])
-        p = len(a)
-
-        noise_std = std * np.sqrt(1 - np.sum(a**2))
-        eps = rng.normal(0, noise_std, size=n_samples)
-
-        x = np.zeros(n_samples)
-
-        for t in range(p, n_samples):
-            x[t] = np.dot(a, x[t-p:t][::-1]) + eps[t]
-
-        x += mu
-        sigs[f"sig_{i+1}"] = x
-
-    return pd.DataFrame({"time_s": time_s, **sigs})
-
-
-
-def event_criteria_mean(sig, thresh, mode="gt"):
-    val = np.mean(sig)
-    return val > thresh if mode == "gt" else val < thresh
-
-
-def event_criteria_std(sig, thresh):
-    return np.std(sig) > thresh
-
-
-def event_criteria_fft_band(sig, f_0, band, thresh):
-    freqs, psd = signal.welch(sig, fs=f_0)
-    mask = (freqs >= band[0]) & (freqs <= band[1])
-    power = np.mean(psd[mask])
-    return power > thresh
-
-
-def event_criteria_peaks(sig, min_peaks):
-    peaks, _ = signal.find_peaks(sig)
-    return len(peaks) >= min_peaks
-
-
-def generate_events(
-    sigs_X_df,
-    f_0,
-    window_s=5,
-    hop_len_s = 2,
-    event_defs=None
-):
-    """
-    event_defs = dict of:
-    eID -> dict(criteria_fn, sigs, params)
-    """
-    events = []
-    win = int(window_s * f_0)
-    hop = int(hop_len_s * f_0)
-
-    for t_idx in range(win, len(sigs_X_df), hop):
-        t = sigs_X_df.loc[t_idx, "time_s"]
-
-        for eID, edef in event_defs.items():
-            sig_data = [
-                sigs_X_df.loc[t_idx-win:t_idx, s].values
-                for s in edef["sigs"]
-            ]
-
-            if edef["criteria"](*sig_data, **edef["params"]):
-                events.append({"time_t": t, "eID": eID})
-
-    return pd.DataFrame(events)
-
-
-
-
-def plot_sigs(
-    sigs_X_df,
-    events_X_df,
-    t_int,
-    sigs_lst,
-    events_lst=None
-):
-    fig, ax = plt.subplots(len(sigs_lst), 1, figsize=(12, 2.5 * len(sigs_lst)), sharex=True)
-
-    if len(sigs_lst) == 1:
-        ax = [ax]
-
-    for i, sig in enumerate(sigs_lst):
-        df = sigs_X_df[
-            (sigs_X_df.time_s >= t_int[0]) &
-            (sigs_X_df.time_s <= t_int[1])
-        ]
-        ax[i].plot(df.time_s, df[sig], label=sig)
-        ax[i].set_ylabel(sig)
-        ax[i].legend(loc="upper right")
-
-        if events_lst:
-            for _, ev in events_X_df[events_X_df.eID.isin(events_lst)].iterrows():
-                if t_int[0] <= ev.time_t <= t_int[1]:
-                    ax[i].axvline(ev.time_t, linestyle="--", alpha=0.6)
-
-    ax[-1].set_xlabel("Time [s]")
-    plt.tight_layout()
-    plt.show()
+import functools
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy import signal, stats
+import signal_io_tools as sio
+from plot_tools import minmax_downsample, plot_width_px
+
+
+def ar_from_timescale(tau_s, f_0, p):
+    """
+    Generate stable AR(p) coefficients with decay time ~tau_s
+    """
+    phi = np.exp(-1 / (f_0 * tau_s))
+    a = phi ** np.arange(1, p + 1)
+    a /= np.sum(a) * 1.1
+    return a.tolist()
+
+
+def ar_burn_in(a, tol=1e-6, max_len=100_000):
+    """
+    Number of samples after which the AR(p) impulse response has decayed
+    below tol, i.e. after which a zero-started recursion is stationary.
+    """
+    a = np.asarray(a, dtype=float)
+    if a.size == 0 or not np.any(a):
+        return 0
+    r = np.max(np.abs(np.roots(np.r_[1.0, -a])))
+    if r >= 1:
+        # Non-stationary model, there is nothing to converge to
+        return 0
+    return int(min(np.ceil(np.log(tol) / np.log(r)), max_len))
+
+
+def _ar_noise_std(mu_std, ar_params):
+    return np.array([
+        std * np.sqrt(1 - np.sum(np.asarray(a) ** 2))
+        for (_, std), a in zip(mu_std, ar_params)
+    ])
+
+
+def _ar_filter(eps, ar_params, zi=None):
+    """
+    Run x[t] = sum_k a_k x[t-k] + eps[t] over every column of eps (samples x N)
+    as an IIR filter. Returns x and the final filter state of every signal.
+    """
+    x = np.empty_like(eps)
+    zf = []
+    for i, a in enumerate(ar_params):
+        den = np.r_[1.0, -np.asarray(a, dtype=float)]
+        z = np.zeros(len(den) - 1) if zi is None else zi[i]
+        x[:, i], z = signal.lfilter([1.0], den, eps[:, i], zi=z)
+        zf.append(z)
+    return x, zf
+
+
+def _ar_start(rng, mu_std, ar_params):
+    """
+    Innovation scale, means and the filter state after the burn-in, shared by
+    the one-shot and the chunked generator so both consume rng identically.
+    """
+    N = len(ar_params)
+    noise_std = _ar_noise_std(mu_std, ar_params)
+    mu = np.array([m for m, _ in mu_std])
+    n_burn = max(ar_burn_in(a) for a in ar_params)
+    _, zi = _ar_filter(rng.standard_normal((n_burn, N)) * noise_std, ar_params)
+    return noise_std, mu, zi
+
+
+def _ar_loop(rng, n_samples, mu_std, ar_params):
+    """
+    Reference per-sample AR(p) recursion, started from zeros.
+    """
+    sigs = {}
+    for i, a in enumerate(ar_params):
+        mu, std = mu_std[i]
+        a = np.array(a)
+        p = len(a)
+
+        noise_std = std * np.sqrt(1 - np.sum(a**2))
+        eps = rng.normal(0, noise_std, size=n_samples)
+
+        x = np.zeros(n_samples)
+
+        for t in range(p, n_samples):
+            x[t] = np.dot(a, x[t-p:t][::-1]) + eps[t]
+
+        x += mu
+        sigs[f"sig_{i+1}"] = x
+    return sigs
+
+
+def generate_signals_A1(
+    M=5,
+    N=5,
+    f_0=20,
+    T=300,
+    lag_s=None,
+    mu_std=None,
+    arma_params=None,
+    seed=42,
+    method="lfilter"
+):
+    """
+    Returns sigs_X_df
+    """
+    # AR(1) coefficient from autocorrelation time
+    ar_params = [[np.exp(-1 / (f_0 * tau))] for tau in lag_s[:N]]
+    return generate_signals_Ap(N, f_0, T, mu_std, ar_params, seed=seed, method=method)
+
+def generate_signals_Ap(
+    N,
+    f_0,
+    T,
+    mu_std,
+    ar_params,
+    seed=42,
+    method="lfilter"
+):
+    """
+    Generate N stationary AR(p) time series.
+    
+    ar_params: list of AR coefficient lists, one per signal
+    method: "lfilter" draws the innovations of all signals in one call and
+            runs each recursion as an IIR filter, discarding a burn-in so the
+            output is stationary from the first sample; "loop" is the original
+            per-sample recursion started from zeros (kept as a reference)
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(T * f_0)
+    time_s = np.arange(n_samples) / f_0
+    mu_std = mu_std[:N]
+    ar_params = ar_params[:N]
+
+    if method == "loop":
+        sigs = _ar_loop(rng, n_samples, mu_std, ar_params)
+        return pd.DataFrame({"time_s": time_s, **sigs})
+
+    noise_std, mu, zi = _ar_start(rng, mu_std, ar_params)
+    x, _ = _ar_filter(rng.standard_normal((n_samples, N)) * noise_std, ar_params, zi)
+    x += mu
+
+    sigs = {f"sig_{i+1}": x[:, i] for i in range(N)}
+    return pd.DataFrame({"time_s": time_s, **sigs})
+
+
+def generate_signals_Ap_chunks(
+    N,
+    f_0,
+    T,
+    mu_std,
+    ar_params,
+    seed=42,
+    chunk_size=72_000
+):
+    """
+    Generate the same N AR(p) time series as generate_signals_Ap, but yield
+    them as consecutive sigs_X_df chunks of chunk_size samples.
+
+    The filter state is carried across chunk boundaries, so concatenating the
+    chunks reproduces the one-shot output exactly, while peak memory stays
+    O(chunk_size x N). Chunks keep the global sample index.
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(T * f_0)
+    mu_std = mu_std[:N]
+    ar_params = ar_params[:N]
+
+    noise_std, mu, zi = _ar_start(rng, mu_std, ar_params)
+    for t0 in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - t0)
+        x, zi = _ar_filter(rng.standard_normal((n, N)) * noise_std, ar_params, zi)
+        x += mu
+
+        sigs = {f"sig_{i+1}": x[:, i] for i in range(N)}
+        yield pd.DataFrame(
+            {"time_s": np.arange(t0, t0 + n) / f_0, **sigs},
+            index=pd.RangeIndex(t0, t0 + n)
+        )
+
+
+
+def _generate_job(job):
+    """
+    Generate one (config, seed) job chunk by chunk straight into its file
+    """
+    k, config, seed_seq, f_0, T, out_dir, chunk_size, fmt = job
+    t0 = time.perf_counter()
+    mu_std = config["mu_std"]
+    N = config.get("N", len(mu_std))
+    ar_params = config.get("ar_params")
+    if ar_params is None:
+        ar_params = [[np.exp(-1 / (f_0 * tau))] for tau in config["lag_s"]]
+
+    n_samples = int(T * f_0)
+    meta = {"f_0": f_0, "T": T, "seed": seed_seq, "mu_std": mu_std, "ar_params": ar_params}
+    chunks = generate_signals_Ap_chunks(N, f_0, T, mu_std, ar_params, seed=seed_seq, chunk_size=chunk_size)
+    path = sio.save_df_chunks(chunks, os.path.join(out_dir, f"sigs_X_df_{k:05d}"), n_samples, fmt, meta)
+
+    return {
+        "job": k,
+        "config": config.get("name", k),
+        "spawn_key": seed_seq.spawn_key,
+        "path": path,
+        "n_samples": n_samples,
+        "N": N,
+        "seconds": time.perf_counter() - t0
+    }
+
+
+def generate_signals_batch(
+    configs,
+    n_seeds,
+    out_dir,
+    f_0=20,
+    T=300,
+    seed=42,
+    n_workers=None,
+    chunk_size=72_000,
+    fmt="npy"
+):
+    """
+    Generate every (config, seed) combination in a process pool.
+
+    configs: list of dicts with mu_std and either ar_params or lag_s (AR(1)
+             from autocorrelation time, as generate_signals_A1); optional
+             N and name
+    n_seeds: number of seeds per config; job k gets the k-th child of
+             SeedSequence(seed).spawn, so every job is reproducible on its own
+             and independent of the others and of n_workers
+
+    Each job writes its signals to out_dir as it generates them (see
+    signal_io_tools.save_df_chunks for fmt), so neither the workers nor the
+    parent hold a whole run. Returns one summary row per
+    job and prints the overall throughput in samples per second.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    pairs = list(itertools.product(configs, range(n_seeds)))
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(pairs))
+    jobs = [
+        (k, config, seed_seq, f_0, T, out_dir, chunk_size, fmt)
+        for k, ((config, _), seed_seq) in enumerate(zip(pairs, seed_seqs))
+    ]
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        summary_df = pd.DataFrame(pool.map(_generate_job, jobs))
+    elapsed = time.perf_counter() - t0
+
+    n_total = int((summary_df.n_samples * summary_df.N).sum()) if len(summary_df) else 0
+    print(f"{len(jobs)} jobs, {n_total} samples in {elapsed:.2f} s: {n_total / elapsed:,.0f} samples/s")
+    return summary_df
+
+
+def batched(criteria_fn):
+    """
+    Mark a criteria function as batched: every signal argument may be a 2-D
+    (windows x samples) array and one bool per window is returned (a 1-D
+    window still gives a single bool). generate_events calls batched criteria
+    once over all windows; plain per-window callables are wrapped with
+    per_window.
+    """
+    criteria_fn.batched = True
+    return criteria_fn
+
+
+@batched
+def event_criteria_mean(sig, thresh, mode="gt"):
+    val = np.mean(sig, axis=-1)
+    return val > thresh if mode == "gt" else val < thresh
+
+
+@batched
+def event_criteria_std(sig, thresh):
+    return np.std(sig, axis=-1) > thresh
+
+
+@batched
+def event_criteria_fft_band(sig, f_0, band, thresh):
+    freqs, psd = signal.welch(sig, fs=f_0, axis=-1)
+    mask = (freqs >= band[0]) & (freqs <= band[1])
+    power = np.mean(psd[..., mask], axis=-1)
+    return power > thresh
+
+
+@batched
+def event_criteria_peaks(sig, min_peaks):
+    # Local maxima as +/- slope sign changes, the same peaks signal.find_peaks
+    # reports. The last non-zero slope is carried over flat stretches, so a
+    # plateau counts once and a plateau followed by a rise not at all.
+    d = np.sign(np.diff(sig, axis=-1))
+    idx = np.where(d != 0, np.arange(d.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    prev = np.take_along_axis(d, idx, axis=-1)
+    n_peaks = np.sum((prev[..., :-1] > 0) & (d[..., 1:] < 0), axis=-1)
+    return n_peaks >= min_peaks
+
+
+def running(criteria_fn):
+    """
+    Mark a batched criteria function as running: it also accepts hop= (the
+    distance between consecutive windows) and an optional state= dict, and
+    updates each window from the hop samples entering and leaving it instead
+    of reducing the whole window. generate_events passes hop automatically.
+    """
+    criteria_fn.running = True
+    return batched(criteria_fn)
+
+
+def _running_reduce(sig, hop, reduce, state=None, key="sum", overlap=0, resync=1000):
+    """
+    Additive reduce(a) (a sum over the last axis) of every window in sig
+    (windows x samples, consecutive windows hop apart), updated in O(hop) per
+    window. overlap extra samples are added to the entering/leaving slices for
+    reductions over neighbouring sample pairs.
+
+    With a state dict the running total carries over to the next call, so
+    windows pushed one at a time (online detection) are also O(hop); the
+    total is recomputed from scratch every resync windows against drift.
+    """
+    W = np.atleast_2d(sig)
+    L = W.shape[-1]
+    if hop is None or hop + overlap >= L or len(W) == 0:
+        return reduce(sig)
+
+    enter = reduce(W[:, L - hop - overlap:])
+    leave = reduce(W[:, :hop + overlap])
+    st = state.setdefault(key, {}) if state is not None else {}
+
+    if "total" in st and st["n"] % resync:
+        first = st["total"] + enter[0] - st["leave"]
+    else:
+        first = reduce(W[0])
+    totals = first + np.r_[0, np.cumsum(enter[1:] - leave[:-1])]
+
+    if state is not None:
+        st["total"], st["leave"] = totals[-1], leave[-1]
+        st["n"] = st.get("n", 0) + len(W)
+    return totals if np.ndim(sig) > 1 else totals[0]
+
+
+def _sum(a):
+    return np.sum(a, axis=-1)
+
+
+@running
+def event_criteria_running_mean(sig, thresh, mode="gt", hop=None, state=None):
+    val = _running_reduce(sig, hop, _sum, state) / np.shape(sig)[-1]
+    return val > thresh if mode == "gt" else val < thresh
+
+
+@running
+def event_criteria_running_std(sig, thresh, hop=None, state=None):
+    # Sums of (x - shift) and (x - shift)^2, shifted by the mean of the first
+    # window seen to keep the variance free of cancellation
+    st = state if state is not None else {}
+    if "shift" not in st:
+        st["shift"] = np.mean(np.atleast_2d(sig)[0])
+    shift = st["shift"]
+    L = np.shape(sig)[-1]
+    s1 = _running_reduce(sig, hop, lambda a: np.sum(a - shift, axis=-1), state, "s1")
+    s2 = _running_reduce(sig, hop, lambda a: np.sum((a - shift) ** 2, axis=-1), state, "s2")
+    var = np.maximum(s2 / L - (s1 / L) ** 2, 0)
+    return np.sqrt(var) > thresh
+
+
+@running
+def event_criteria_running_crossings(sig, level, min_crossings, hop=None, state=None):
+    # Number of times the signal crosses level inside the window
+    def crossings(a):
+        above = a > level
+        return np.sum(above[..., 1:] != above[..., :-1], axis=-1)
+
+    n = _running_reduce(sig, hop, crossings, state, overlap=1)
+    return n >= min_crossings
+
+
+def per_window(criteria_fn):
+    """
+    Adapt a single-window criteria function (1-D arrays in, one bool out) to
+    the batched protocol by calling it on every window row.
+    """
+    @functools.wraps(criteria_fn)
+    def criteria_batched(*sigs, **params):
+        return np.array([bool(criteria_fn(*w, **params)) for w in zip(*sigs)], dtype=bool)
+
+    return batched(criteria_batched)
+
+
+def _windows(x, win, hop):
+    """
+    Zero-copy (n_windows x win+1) view of the windows ending at
+    win, win + hop, win + 2 hop, ... (the same samples as .loc[t_idx-win:t_idx])
+    """
+    return np.lib.stride_tricks.sliding_window_view(x, win + 1)[::hop]
+
+
+def _eval_criteria(criteria_fn, sig_data, params):
+    """
+    One bool per window; criteria not marked batched go through per_window
+    """
+    if not getattr(criteria_fn, "batched", False):
+        criteria_fn = per_window(criteria_fn)
+    return np.asarray(criteria_fn(*sig_data, **params), dtype=bool)
+
+
+def generate_events(
+    sigs_X_df,
+    f_0,
+    window_s=5,
+    hop_len_s = 2,
+    event_defs=None,
+    method="strided"
+):
+    """
+    event_defs = dict of:
+    eID -> dict(criteria_fn, sigs, params)
+
+    method: "strided" builds a zero-copy matrix of all windows once per signal
+            and evaluates every criterion over it (see batched); "loop" is the
+            original per-hop .loc implementation (kept as a reference)
+    """
+    win = int(window_s * f_0)
+    hop = int(hop_len_s * f_0)
+
+    if method == "loop":
+        return _generate_events_loop(sigs_X_df, win, hop, event_defs)
+
+    t_idx = np.arange(win, len(sigs_X_df), hop)
+    windows = {}
+    hits = np.zeros((len(t_idx), len(event_defs)), dtype=bool)
+
+    for j, edef in enumerate(event_defs.values() if len(t_idx) else []):
+        for s in edef["sigs"]:
+            if s not in windows:
+                windows[s] = _windows(sigs_X_df[s].to_numpy(), win, hop)
+        sig_data = [windows[s] for s in edef["sigs"]]
+        params = edef["params"]
+        if getattr(edef["criteria"], "running", False):
+            params = {**params, "hop": hop}
+        hits[:, j] = _eval_criteria(edef["criteria"], sig_data, params)
+
+    # Row-major nonzero keeps the loop order: by time, then by eID
+    k, j = np.nonzero(hits)
+    return pd.DataFrame({
+        "time_t": sigs_X_df["time_s"].to_numpy()[t_idx[k]],
+        "eID": pd.Index(list(event_defs))[j]
+    })
+
+
+def _generate_events_loop(sigs_X_df, win, hop, event_defs):
+    events = []
+
+    for t_idx in range(win, len(sigs_X_df), hop):
+        t = sigs_X_df.loc[t_idx, "time_s"]
+
+        for eID, edef in event_defs.items():
+            sig_data = [
+                sigs_X_df.loc[t_idx-win:t_idx, s].values
+                for s in edef["sigs"]
+            ]
+
+            if edef["criteria"](*sig_data, **edef["params"]):
+                events.append({"time_t": t, "eID": eID})
+
+    return pd.DataFrame(events)
+
+
+class OnlineEventDetector:
+    """
+    Stateful counterpart of generate_events for live streams.
+
+    Samples are pushed as they arrive (one at a time or in small batches) and
+    kept in a ring buffer of the last window per signal. Every hop samples the
+    window ending at the newest sample is evaluated against event_defs, so an
+    event is reported by the push that completes its window and the work per
+    sample is bounded by one window evaluation per hop. For the same samples
+    the events are those of generate_events. Running criteria keep their
+    totals between windows and are updated in O(hop).
+
+    All signals used in event_defs are sampled together at f_0 (e.g. the
+    x, y, z of one sensor, or a resampled multi-sensor frame); use one
+    detector per independently sampled stream.
+    """
+
+    def __init__(self, f_0, window_s=5, hop_len_s=2, event_defs=None):
+        self.f_0 = f_0
+        self.event_defs = event_defs
+        self.win = int(window_s * f_0)
+        self.hop = int(hop_len_s * f_0)
+        if self.hop < 1:
+            raise ValueError(f"hop_len_s={hop_len_s} is shorter than one sample at f_0={f_0}")
+        self.sigs = list(dict.fromkeys(s for edef in event_defs.values() for s in edef["sigs"]))
+        self._row = {s: i for i, s in enumerate(self.sigs)}
+
+        # Every sample is written twice, at i and i + cap, so that any window
+        # is a contiguous (zero-copy) slice of the ring
+        self._cap = self.win + 1
+        self._ring = np.zeros((len(self.sigs), 2 * self._cap))
+        self._state = {eID: {} for eID in event_defs}
+        self.n_seen = 0
+        self._next_end = self.win
+
+    def push(self, samples, time_s=None):
+        """
+        samples: dict (or DataFrame) of sig -> one value or a 1-D batch, with
+                 the same length for every signal in event_defs
+        time_s: sample times; taken from samples["time_s"] if present,
+                otherwise the sample index / f_0
+        Returns the list of events {"time_t", "eID"} completed by this push.
+        """
+        X = np.array([np.atleast_1d(np.asarray(samples[s], dtype=float)) for s in self.sigs])
+        n = X.shape[1]
+        if time_s is None and "time_s" in samples:
+            time_s = samples["time_s"]
+        if time_s is None:
+            time_s = (self.n_seen + np.arange(n)) / self.f_0
+        time_s = np.atleast_1d(np.asarray(time_s, dtype=float))
+
+        events = []
+        pos = 0
+        while pos < n:
+            take = min(n - pos, self._next_end + 1 - self.n_seen)
+            self._write(X[:, pos:pos + take])
+            pos += take
+            if self.n_seen == self._next_end + 1:
+                events += self._evaluate(time_s[pos - 1])
+                self._next_end += self.hop
+        return events
+
+    def _write(self, X):
+        idx = (self.n_seen + np.arange(X.shape[1])) % self._cap
+        self._ring[:, idx] = X
+        self._ring[:, idx + self._cap] = X
+        self.n_seen += X.shape[1]
+
+    def _window(self, s):
+        start = (self.n_seen - self._cap) % self._cap
+        return self._ring[self._row[s], start:start + self._cap]
+
+    def _evaluate(self, t):
+        events = []
+        for eID, edef in self.event_defs.items():
+            sig_data = [self._window(s) for s in edef["sigs"]]
+            params = edef["params"]
+            if getattr(edef["criteria"], "running", False):
+                params = {**params, "hop": self.hop, "state": self._state[eID]}
+            if edef["criteria"](*sig_data, **params):
+                events.append({"time_t": t, "eID": eID})
+        return events
+
+
+def generate_events_chunks(
+    sigs_chunks,
+    f_0,
+    window_s=5,
+    hop_len_s=2,
+    event_defs=None
+):
+    """
+    Run generate_events over consecutive sigs_X_df chunks (e.g. from
+    generate_signals_Ap_chunks) and yield one events_X_df per chunk.
+
+    The samples still needed by the next window are carried over, so windows
+    spanning chunk boundaries give the same events as a one-shot run.
+    """
+    win = int(window_s * f_0)
+    hop = int(hop_len_s * f_0)
+
+    tail = None
+    skip = 0
+    for chunk in sigs_chunks:
+        n_skip = min(skip, len(chunk))
+        chunk = chunk.iloc[n_skip:]
+        skip -= n_skip
+        buf = chunk if tail is None else pd.concat([tail, chunk])
+        buf = buf.reset_index(drop=True)
+
+        yield generate_events(buf, f_0, window_s, hop_len_s, event_defs)
+
+        # The next window starts n_win * hop samples into buf
+        n_win = len(range(win, len(buf), hop))
+        next_start = n_win * hop
+        tail = buf.iloc[next_start:]
+        skip += max(0, next_start - len(buf))
+
+
+
+
+def plot_sigs(
+    sigs_X_df,
+    events_X_df,
+    t_int,
+    sigs_lst,
+    events_lst=None,
+    downsample=True
+):
+    fig, ax = plt.subplots(len(sigs_lst), 1, figsize=(12, 2.5 * len(sigs_lst)), sharex=True)
+
+    if len(sigs_lst) == 1:
+        ax = [ax]
+
+    # time_s is sorted: one binary search instead of a mask per subplot
+    time_s = sigs_X_df.time_s.to_numpy()
+    i0 = np.searchsorted(time_s, t_int[0], side="left")
+    i1 = np.searchsorted(time_s, t_int[1], side="right")
+    t_all = time_s[i0:i1]
+
+    if events_lst:
+        ev_t = events_X_df.time_t[events_X_df.eID.isin(events_lst)].to_numpy()
+        ev_t = ev_t[(ev_t >= t_int[0]) & (ev_t <= t_int[1])]
+
+    for i, sig in enumerate(sigs_lst):
+        t, y = t_all, sigs_X_df[sig].to_numpy()[i0:i1]
+        if downsample:
+            t, y = minmax_downsample(t, y, 2 * plot_width_px(ax[i]))
+        ax[i].plot(t, y, label=sig)
+        ax[i].set_ylabel(sig)
+        ax[i].legend(loc="upper right")
+
+        if events_lst:
+            # One LineCollection per axis, spanning the full height like axvline
+            ax[i].vlines(ev_t, 0, 1, transform=ax[i].get_xaxis_transform(), linestyle="--", alpha=0.6)
+
+    ax[-1].set_xlabel("Time [s]")
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,277 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+FORMATS = ["npy", "parquet", "feather", "csv", "xlsx"]
+
+
+def _json_default(obj):
+    if isinstance(obj, np.random.SeedSequence):
+        return {"entropy": obj.entropy, "spawn_key": list(obj.spawn_key)}
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError(f"Cannot store {type(obj).__name__} in metadata")
+
+
+def _to_records(df):
+    """
+    DataFrame -> structured numpy array; text columns become fixed-width unicode
+    """
+    cols = []
+    for c in df.columns:
+        v = df[c].to_numpy()
+        if v.dtype == object or pd.api.types.is_string_dtype(df[c]):
+            v = v.astype(str)
+        cols.append(v)
+    return np.rec.fromarrays(cols, names=[str(c) for c in df.columns])
+
+
+def write_meta(base, fmt, df, n_rows=None, meta=None):
+    """
+    JSON sidecar next to the data file: format, shape, dtypes and free-form
+    meta (f_0, seed, ar_params, mu_std, ...)
+    """
+    sidecar = {
+        "format": fmt,
+        "n_rows": len(df) if n_rows is None else n_rows,
+        "columns": [str(c) for c in df.columns],
+        "dtypes": [str(t) for t in df.dtypes],
+        "meta": meta or {},
+    }
+    with open(base + ".json", "w") as f:
+        json.dump(sidecar, f, indent=2, default=_json_default)
+
+
+def read_meta(base):
+    with open(base + ".json") as f:
+        return json.load(f)
+
+
+def save_df(df, base, fmt="npy", meta=None):
+    """
+    Store df as base.<fmt> plus a base.json metadata sidecar.
+
+    fmt: "npy" (default, numpy only), "parquet" / "feather" (need pyarrow),
+         "csv", or "xlsx" (opt-in Excel export, slow and capped at ~1M rows)
+    Returns the data file path.
+    """
+    path = f"{base}.{fmt}"
+    if fmt == "npy":
+        np.save(path, _to_records(df), allow_pickle=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "xlsx":
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+    write_meta(base, fmt, df, meta=meta)
+    return path
+
+
+def save_df_chunks(chunks, base, n_rows=None, fmt="npy", meta=None):
+    """
+    Write consecutive DataFrame chunks (e.g. from generate_signals_Ap_chunks)
+    to one file, holding no more than one chunk in memory.
+
+    npy needs n_rows upfront: the file is preallocated and filled through a
+    memory map. parquet writes one row group per chunk, csv appends.
+    Returns the data file path.
+    """
+    path = f"{base}.{fmt}"
+    out = None
+    written = 0
+    first = None
+
+    for chunk in chunks:
+        if first is None:
+            first = chunk.iloc[:0]
+        if fmt == "npy":
+            rec = _to_records(chunk)
+            if out is None:
+                if n_rows is None:
+                    raise ValueError("fmt='npy' needs n_rows to preallocate the file")
+                out = np.lib.format.open_memmap(path, mode="w+", dtype=rec.dtype, shape=(n_rows,))
+            out[written:written + len(rec)] = rec
+        elif fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if out is None:
+                out = pq.ParquetWriter(path, table.schema)
+            out.write_table(table)
+        elif fmt == "csv":
+            chunk.to_csv(path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        else:
+            raise ValueError(f"Chunked writing supports npy, parquet and csv, not {fmt!r}")
+        written += len(chunk)
+
+    if fmt == "npy" and out is not None:
+        out.flush()
+        del out
+        if written != n_rows:
+            raise ValueError(f"Expected {n_rows} rows, got {written}")
+    elif fmt == "parquet" and out is not None:
+        out.close()
+
+    write_meta(base, fmt, first if first is not None else pd.DataFrame(), n_rows=written, meta=meta)
+    return path
+
+
+def load_df(base, fmt=None):
+    """
+    Load a DataFrame stored with save_df / save_df_chunks. The format comes
+    from fmt, the base.json sidecar, or else the first existing base.<fmt>
+    file (so stores written before the sidecar existed still load).
+    """
+    if fmt is None and os.path.exists(base + ".json"):
+        fmt = read_meta(base)["format"]
+    if fmt is None:
+        fmt = next((f for f in FORMATS if os.path.exists(f"{base}.{f}")), None)
+    if fmt is None:
+        raise FileNotFoundError(f"No stored data found for {base}")
+
+    path = f"{base}.{fmt}"
+    if fmt == "npy":
+        return pd.DataFrame(np.load(path, allow_pickle=False))
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    if fmt == "csv":
+        return pd.read_csv(path)
+    if fmt == "xlsx":
+        return pd.read_excel(path)
+    raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+
+def write_store(base, sigs, n_rows=None, f_0=None, time_col="time_s", meta=None):
+    """
+    Write signals as a memory-mapped store: base.npy holds one contiguous
+    float64 row per signal (n_sigs x n_samples), base.json the header.
+
+    sigs: DataFrame with time_col, or an iterable of DataFrame chunks (e.g.
+          generate_signals_Ap_chunks, then n_rows is needed)
+    f_0: sampling rate of fixed-rate signals; only the first time stamp is
+         kept in the header. With f_0=None the (sorted) time_col is stored
+         as a column for irregularly sampled data.
+    Returns the data file path.
+    """
+    if isinstance(sigs, pd.DataFrame):
+        n_rows = len(sigs)
+        sigs = [sigs]
+
+    path = base + ".npy"
+    out = None
+    written = 0
+    for chunk in sigs:
+        if out is None:
+            columns = [c for c in chunk.columns if f_0 is None or c != time_col]
+            t_start = float(chunk[time_col].iloc[0]) if len(chunk) else 0.0
+            out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(len(columns), n_rows))
+        out[:, written:written + len(chunk)] = chunk[columns].to_numpy(dtype=np.float64).T
+        written += len(chunk)
+    out.flush()
+    del out
+
+    header = {
+        "format": "store",
+        "n_rows": written,
+        "columns": columns,
+        "f_0": f_0,
+        "t_start": t_start,
+        "time_col": time_col,
+        "meta": meta or {},
+    }
+    with open(base + ".json", "w") as f:
+        json.dump(header, f, indent=2, default=_json_default)
+    return path
+
+
+class SignalStore:
+    """
+    Random access to a store written by write_store without loading it:
+
+        store = SignalStore("GenData/sigs_X_df")
+        store[10:70, ["sig_1", "sig_3"]]     # seconds 10 <= t < 70
+
+    returns a DataFrame (time_col + requested signals) whose signal columns
+    are views into the memory map, so opening and slicing cost nothing
+    upfront and only the pages touched are read. Column selections with a
+    constant step in store order (single, adjacent, every other, ...) are
+    zero-copy; other selections copy just the requested slice.
+    """
+
+    def __init__(self, base):
+        self.header = read_meta(base)
+        self.data = np.load(base + ".npy", mmap_mode="r")
+        self.columns = self.header["columns"]
+        self.f_0 = self.header["f_0"]
+        self.t_start = self.header["t_start"]
+        self.time_col = self.header["time_col"]
+        self._col = {c: i for i, c in enumerate(self.columns)}
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def rows(self, t0=None, t1=None):
+        """
+        Sample range [i0, i1) with t0 <= t < t1; binary search on the stored
+        time column for irregular data, arithmetic for fixed-rate data
+        """
+        n = len(self)
+        if self.f_0 is None:
+            t = self.data[self._col[self.time_col]]
+            i0 = 0 if t0 is None else int(np.searchsorted(t, t0, side="left"))
+            i1 = n if t1 is None else int(np.searchsorted(t, t1, side="left"))
+        else:
+            i0 = 0 if t0 is None else int(np.ceil((t0 - self.t_start) * self.f_0 - 1e-9))
+            i1 = n if t1 is None else int(np.ceil((t1 - self.t_start) * self.f_0 - 1e-9))
+        return min(max(i0, 0), n), min(max(i1, 0), n)
+
+    def __getitem__(self, key):
+        t_slice, cols = key if isinstance(key, tuple) else (key, None)
+        if not isinstance(t_slice, slice):
+            raise TypeError("Index the store by a time slice, e.g. store[t0:t1, cols]")
+        i0, i1 = self.rows(t_slice.start, t_slice.stop)
+
+        if cols is None:
+            cols = self.columns
+        elif isinstance(cols, str):
+            cols = [cols]
+        cols = [c for c in cols if c != self.time_col]
+        idx = [self._col[c] for c in cols]
+
+        step = idx[1] - idx[0] if len(idx) > 1 else 1
+        if step > 0 and idx == list(range(idx[0], idx[-1] + 1, step)):
+            block = self.data[idx[0]:idx[-1] + 1:step, i0:i1]
+        else:
+            block = self.data[idx, i0:i1]
+        sigs_df = pd.DataFrame(block.T, columns=cols, copy=False)
+
+        if self.f_0 is None:
+            time_s = self.data[self._col[self.time_col], i0:i1]
+        else:
+            time_s = self.t_start + np.arange(i0, i1) / self.f_0
+        sigs_df.insert(0, self.time_col, time_s)
+        return sigs_df
+
+
+def store_from_sensor_csv(csv_path, base):
+    """
+    Convert an imported sensor CSV (x, y, z or q0..q3 plus an ISO timestamp
+    column) to a SignalStore with time_s in seconds since the first sample;
+    the absolute start time is kept in the header meta.
+    """
+    df = pd.read_csv(csv_path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    ts = df.pop("timestamp")
+    df.insert(0, "time_s", (ts - ts.iloc[0]).dt.total_seconds())
+    return write_store(base, df, meta={"t0_utc": ts.iloc[0].isoformat(), "source": csv_path})
@@ -0,0 +1,399 @@
+"""
+Local stand-in for the Supabase PostgREST endpoint used by data-import.py,
+for benchmarks and checks without network access.
+
+    server = StubServer(tables, max_rows=1000, latency_s=0.02).start()
+    os.environ["VITE_SUPABASE_URL"] = server.url
+
+It serves GET /rest/v1/<table> with eq./gt./gte. filters, the keyset
+condition of data-import's iter_pages (or=(timestamp.gt.T,and(...))), order,
+offset/limit, select lists with aliases, JSON paths (data->x) and embedded
+resources, and the max-rows cap of a real PostgREST server. Tables are lists of rows, or
+a SyntheticSensorData for sensor_data of any length. Rows are sorted on
+every order key given (timestamp.asc,id.asc); with shuffle_ties, rows
+that tie on all of them come back in a new order for every request, as
+Postgres may return them across separate OFFSET queries.
+
+Failures can be injected: fail_rate answers that share of requests with
+fail_status (or drops the connection when fail_status is None), and
+requests number fail_from and later all fail, like an outage.
+"""
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import pandas as pd
+
+
+SENSOR_TYPE_IDS = {
+    "accelerometer": '3b48eed5-6ece-4eb8-8c88-b5e645839385',
+    "gyroscope": 'd4ad2653-b430-40c2-9f47-bdc140119c57',
+    "linear_acceleration": '98a08aec-2fa6-4f63-9386-0f43015d701c',
+    "relative_orientation": 'c850391c-5cf3-4b3f-9fac-26438f5a9353'
+}
+
+FAKE_KEY = "stub.stub.stub"
+
+
+def make_tables(recording_id, n_rows, n_events=20, seed=0):
+    """
+    Synthetic sensor_data and events rows shaped like the Supabase tables.
+    Every sensor type has its own random streams and ids, so the tables for
+    a larger n_rows only add rows at the end, like a recording that goes on.
+    """
+    t0 = datetime.fromisoformat("2025-12-11T15:29:42.000+00:00").timestamp()
+    sensor_data = []
+    for k, (name, type_id) in enumerate(SENSOR_TYPE_IDS.items()):
+        t = t0 + np.cumsum(np.random.default_rng([seed, k, 0]).uniform(0.05, 0.15, n_rows))
+        values = np.random.default_rng([seed, k, 1]).normal(size=(n_rows, 4)).round(4)
+        for i in range(n_rows):
+            if name == "relative_orientation":
+                data = {"quaternion": values[i].tolist()}
+            else:
+                data = {"x": values[i, 0], "y": values[i, 1], "z": values[i, 2]}
+            sensor_data.append({
+                "id": i * len(SENSOR_TYPE_IDS) + k + 1,
+                "recording_id": recording_id,
+                "sensor_type_id": type_id,
+                "timestamp": _iso(t[i]),
+                "data": data,
+                "created_at": _iso(t[i] + 0.5),
+            })
+
+    events = []
+    for i in range(n_events):
+        e_id, desc = [("eID2_10", "Hands up"), ("eID2_11", "Hands down")][i % 2]
+        events.append({
+            "id": i + 1,
+            "recording_id": recording_id,
+            "event_code_id": f"code-{e_id}",
+            "timestamp": _iso(t0 + 2.0 * i + 1),
+            "offset_ms": int(2000 * i + 1000),
+            "created_at": _iso(t0 + 2.0 * i + 1.5),
+            "event_codes": {"e_id": e_id, "e_description_butt": desc},
+        })
+    return {"sensor_data": sensor_data, "events": events}
+
+
+def tables_from_session(recording_id, session_dir):
+    """
+    sensor_data and events rows rebuilt from a session imported under Data/,
+    i.e. a recorded response fixture with real values and timestamps
+    """
+    files = {
+        "accelerometer": "accel", "gyroscope": "gyro",
+        "linear_acceleration": "linear", "relative_orientation": "relative_orientation"
+    }
+    sensor_data = []
+    for name, prefix in files.items():
+        df = pd.read_csv(f"{session_dir}/sensor-data/{prefix}_signal_data.csv")
+        for rec in df.to_dict("records"):
+            ts = rec.pop("timestamp")
+            if name == "relative_orientation":
+                data = {"quaternion": [rec["q0"], rec["q1"], rec["q2"], rec["q3"]]}
+            else:
+                data = rec
+            sensor_data.append({
+                "id": len(sensor_data) + 1,
+                "recording_id": recording_id,
+                "sensor_type_id": SENSOR_TYPE_IDS[name],
+                "timestamp": ts,
+                "data": data,
+                "created_at": ts,
+            })
+
+    events = []
+    path = f"{session_dir}/events.csv"
+    for i, rec in enumerate(pd.read_csv(path).to_dict("records") if os.path.exists(path) else []):
+        rec["id"] = i + 1
+        rec["recording_id"] = recording_id
+        rec["event_codes"] = json.loads(rec["event_codes"].replace("'", '"'))
+        events.append(rec)
+    return {"sensor_data": sensor_data, "events": events}
+
+
+class SyntheticSensorData:
+    """
+    sensor_data table with n_rows per sensor type at rate_hz, generated when
+    a page is requested instead of held as rows, for fixtures of millions of
+    rows. StubServer answers eq. filters on recording_id / sensor_type_id
+    and gt. / gte. on timestamp, ordered by timestamp, and the keyset
+    condition of iter_pages.
+    """
+
+    def __init__(self, recording_id, n_rows, rate_hz=100, seed=0):
+        self.recording_id = recording_id
+        self.n_rows = n_rows
+        self.rate_hz = rate_hz
+        self.seed = seed
+        self.t0 = datetime.fromisoformat("2025-12-11T15:29:42.000+00:00").timestamp()
+        self._sensor = {type_id: k for k, type_id in enumerate(SENSOR_TYPE_IDS.values())}
+
+    def __len__(self):
+        return len(SENSOR_TYPE_IDS) * self.n_rows
+
+    def row(self, k, i):
+        t = self.t0 + i / self.rate_hz
+        values = [round(math.sin(0.01 * i + k + j + self.seed), 4) for j in range(4)]
+        if k == self._sensor[SENSOR_TYPE_IDS["relative_orientation"]]:
+            data = {"quaternion": values}
+        else:
+            data = {"x": values[0], "y": values[1], "z": values[2]}
+        return {
+            "id": i * len(SENSOR_TYPE_IDS) + k + 1,
+            "recording_id": self.recording_id,
+            "sensor_type_id": list(SENSOR_TYPE_IDS.values())[k],
+            "timestamp": _iso(t),
+            "data": data,
+            "created_at": _iso(t + 0.5),
+        }
+
+    def _first_row(self, val, strict):
+        # First row after (strict) or at the timestamp val. Rows are at
+        # t0 + i / rate_hz rounded to the millisecond, so start a little
+        # before the exact index and step over the rows it missed
+        t = _parse_ts(val)
+        i = max(int(np.floor((t.timestamp() - self.t0) * self.rate_hz)) - 2, 0)
+        while i < self.n_rows:
+            t_i = _parse_ts(_iso(self.t0 + i / self.rate_hz))
+            if t_i > t or (t_i == t and not strict):
+                break
+            i += 1
+        return i
+
+    def query(self, filters, offset, n, after=None):
+        k, start = None, 0
+        for col, op, val in filters:
+            if col == "recording_id" and val != self.recording_id:
+                return []
+            if col == "sensor_type_id":
+                k = self._sensor.get(val)
+                if k is None:
+                    return []
+            if col == "timestamp" and op in ("gt", "gte"):
+                start = self._first_row(val, strict=op == "gt")
+        if after is not None and k is not None:
+            # First row after (timestamp, id); timestamps are unique per sensor
+            # and ids grow with them
+            j = self._first_row(after[0], strict=False)
+            if j < self.n_rows and self.row(k, j)["timestamp"] == after[0] and j * len(SENSOR_TYPE_IDS) + k + 1 <= after[1]:
+                j += 1
+            start = max(start, j)
+        start = max(start, 0) + offset
+        if k is None:
+            return [self.row(i // self.n_rows, i % self.n_rows) for i in range(start, min(start + n, len(self)))]
+        return [self.row(k, i) for i in range(start, min(start + n, self.n_rows))]
+
+
+def _split_select(select):
+    # Top-level comma split, keeping embedded resources like codes(a,b) whole
+    items, depth, item = [], 0, ""
+    for ch in select:
+        depth += (ch == "(") - (ch == ")")
+        if ch == "," and depth == 0:
+            items.append(item)
+            item = ""
+        else:
+            item += ch
+    return items + [item] if item else items
+
+
+def project(row, select):
+    """
+    Apply a PostgREST select list to one row
+    """
+    if select in (None, "*"):
+        return row
+    out = {}
+    for item in _split_select(select):
+        alias, _, expr = item.rpartition(":") if ":" in item and "(" not in item else ("", "", item)
+        if "(" in expr:
+            name, _, cols = expr[:-1].partition("(")
+            out[alias or name] = project(row.get(name) or {}, cols)
+        elif "->" in expr:
+            text = "->>" in expr
+            col, _, key = expr.partition("->>" if text else "->")
+            value = (row.get(col) or {}).get(key)
+            out[alias or key] = str(value) if text and value is not None else value
+        else:
+            out[alias or expr] = row.get(expr)
+    return out
+
+
+def _iso(t):
+    return datetime.fromtimestamp(t, tz=timezone.utc).isoformat(timespec="milliseconds")
+
+
+@lru_cache(maxsize=None)
+def _parse_ts(v):
+    return datetime.fromisoformat(v)
+
+
+def _matches(row, filters):
+    for col, op, val in filters:
+        if op == "eq" and str(row.get(col)) != val:
+            return False
+        if op == "gt" and not _parse_ts(row[col]) > _parse_ts(val):
+            return False
+        if op == "gte" and not _parse_ts(row[col]) >= _parse_ts(val):
+            return False
+    return True
+
+
+def _parse_after(val):
+    """
+    The keyset condition of iter_pages,
+    (timestamp.gt."T",and(timestamp.eq."T",id.gt.I)) -> (T, I)
+    """
+    m = re.fullmatch(r'\(timestamp\.gt\."([^"]+)",and\(timestamp\.eq\."\1",id\.gt\.(-?\d+)\)\)', val)
+    if m is None:
+        raise ValueError(f"unsupported or= filter: {val}")
+    return m.group(1), int(m.group(2))
+
+
+def _key(row):
+    return _parse_ts(row["timestamp"]), row["id"]
+
+
+def _sort(rows, order):
+    """
+    Sort rows in place by a PostgREST order list, e.g. timestamp.asc,id.asc;
+    stable sorts from the last key to the first, so later keys break ties
+    """
+    for item in reversed(order.split(",")):
+        col, _, direction = item.partition(".")
+        if col in ("timestamp", "created_at"):
+            rows.sort(key=lambda r: _parse_ts(r[col]), reverse=direction.startswith("desc"))
+        else:
+            rows.sort(key=lambda r: r[col], reverse=direction.startswith("desc"))
+
+
+class StubServer:
+    def __init__(self, tables, max_rows=1000, latency_s=0.0, port=0,
+                 fail_rate=0.0, fail_status=503, fail_from=None, seed=0, shuffle_ties=False):
+        self.tables = tables
+        self.shuffle_ties = shuffle_ties
+        self.max_rows = max_rows
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.fail_from = fail_from
+        self._rng = np.random.default_rng(seed)
+        self.n_requests = 0
+        self.n_failed = 0
+        self.n_connections = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _should_fail(self):
+        with self._lock:
+            self.n_requests += 1
+            fail = (self.fail_from is not None and self.n_requests >= self.fail_from) or self._rng.random() < self.fail_rate
+            self.n_failed += fail
+            return fail
+
+    def query(self, table, params):
+        filters = []
+        offset, limit, order, select, after = 0, None, None, None, None
+        for key, val in params:
+            if key == "or":
+                after = _parse_after(val)
+            elif key == "select":
+                select = val
+            elif key == "offset":
+                offset = int(val)
+            elif key == "limit":
+                limit = int(val)
+            elif key == "order":
+                order = val
+            else:
+                op, _, arg = val.partition(".")
+                filters.append((key, op, arg))
+
+        n = self.max_rows if limit is None else min(limit, self.max_rows)
+        source = self.tables.get(table, [])
+        if isinstance(source, SyntheticSensorData):
+            return [project(r, select) for r in source.query(filters, offset, n, after)]
+
+        # Pages of one query share the filtered, sorted rows (the keyset
+        # condition is applied by bisection, ordered by timestamp, then id),
+        # unless ties are shuffled anew for every request
+        key = (table, tuple(filters), order)
+        if key not in self._cache:
+            rows = [r for r in source if _matches(r, filters)]
+            if order and not self.shuffle_ties:
+                _sort(rows, order)
+            self._cache[key] = [rows, None]
+        rows, keys = self._cache[key]
+        if order and self.shuffle_ties:
+            with self._lock:
+                rows = [rows[i] for i in self._rng.permutation(len(rows))]
+            _sort(rows, order)
+            if after is not None:
+                rows = [r for r in rows if _key(r) > (_parse_ts(after[0]), after[1])]
+        elif after is not None:
+            if keys is None:
+                keys = self._cache[key][1] = [_key(r) for r in rows]
+            offset += bisect.bisect_right(keys, (_parse_ts(after[0]), after[1]))
+        return [project(r, select) for r in rows[offset:offset + n]]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.n_connections += 1
+
+            def do_GET(self):
+                if server.latency_s:
+                    time.sleep(server.latency_s)
+                if server._should_fail():
+                    if server.fail_status is None:
+                        self.close_connection = True
+                        return
+                    self.send_response(server.fail_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                url = urlparse(self.path)
+                table = url.path.rsplit("/", 1)[-1]
+                rows = server.query(table, parse_qsl(url.query))
+                body = json.dumps(rows).encode()
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
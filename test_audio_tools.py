@@ -0,0 +1,72 @@
+"""
+Checks of audio_tools.py: the block-wise features match a per-window
+computation over the whole file, on any grid. The timing side is in
+runBenchmarks.py.
+
+    python -m pytest -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.io import wavfile
+
+import audio_tools as at
+
+T0 = 1765466982.25
+
+
+def write_wav(path, rate, seconds, channels=1):
+    # Noise with a 440 Hz tone in the second half
+    rng = np.random.default_rng(rate)
+    x = 0.05 * rng.normal(size=(int(seconds * rate), channels))
+    t = np.arange(len(x)) / rate
+    x[len(x) // 2:] += 0.5 * np.sin(2 * np.pi * 440 * t[len(x) // 2:, None])
+    wavfile.write(path, rate, (x * 32767).astype(np.int16).squeeze())
+    return path
+
+
+def features_per_window(path, audio_t0_epoch_s, f_s, t_start, n, win_s=None):
+    # One window at a time over the whole file in memory
+    rate, data = wavfile.read(path)
+    x = at._to_float(data.reshape(len(data), -1))
+    win = int(round((win_s or 1 / f_s) * rate))
+    rows = []
+    for k in range(n):
+        s = int(np.round((t_start + k / f_s - audio_t0_epoch_s) * rate)) - win // 2
+        if s < 0 or s + win > len(x):
+            rows.append({})
+        else:
+            rows.append({name: v[0] for name, v in at.window_features(x[None, s:s + win], rate).items()})
+    return pd.DataFrame(rows, columns=["audio_rms", "audio_zcr"] + [f"audio_band_{lo}_{hi}" for lo, hi in at.AUDIO_BANDS])
+
+
+@pytest.mark.parametrize("block_s", [0.35, 1.0, 60.0])
+@pytest.mark.parametrize("rate, f_s", [(8000, 10), (22050, 8), (44100, 30)])
+def test_blocks_match_per_window(tmp_path, rate, f_s, block_s):
+    # 22050 / 8 is not a whole number of samples per grid step
+    path = write_wav(f"{tmp_path}/a.wav", rate, 4)
+    t_start, n = T0 + 0.0123, int(4 * f_s)
+    audio_df = at.audio_features(path, T0, f_s, t_start=t_start, n=n, block_s=block_s)
+    assert audio_df.index.tolist() == list(range(n))
+    np.testing.assert_allclose(audio_df["time_s"], np.arange(n) / f_s)
+    expected = features_per_window(path, T0, f_s, t_start, n)
+    np.testing.assert_allclose(audio_df.drop(columns="time_s").to_numpy(), expected.to_numpy(), rtol=1e-5, atol=1e-9)
+
+
+def test_windows_past_the_audio_edges_are_nan(tmp_path):
+    # The grid starts 1 s before the audio and ends 1 s after it
+    path = write_wav(f"{tmp_path}/a.wav", 8000, 3)
+    audio_df = at.audio_features(path, T0, f_s=10, t_start=T0 - 1.0, n=50, win_s=0.2, block_s=0.5)
+    covered = audio_df["audio_rms"].notna().to_numpy()
+    # Windows of 0.2 s centred on the grid: grid points 1.1 s ... 3.9 s
+    assert covered.tolist() == [11 <= k <= 39 for k in range(50)]
+    assert audio_df.loc[covered].notna().all().all()
+    assert audio_df.attrs["t0_epoch_s"] == T0 - 1.0
+
+
+def test_stereo_is_averaged_to_mono(tmp_path):
+    rate, data = 8000, np.zeros((8000, 2), dtype=np.int16)
+    data[:, 0] = 16384
+    wavfile.write(f"{tmp_path}/s.wav", rate, data)
+    audio_df = at.audio_features(f"{tmp_path}/s.wav", T0, f_s=10)
+    np.testing.assert_allclose(audio_df["audio_rms"].dropna(), 0.25)
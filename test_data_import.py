@@ -0,0 +1,218 @@
+"""
+Checks of data-import.py against the local stub PostgREST server
+(supabase_stub.py): paging, incremental import, retries and recovery.
+The timing side of the same code is in runBenchmarks.py.
+
+    python -m pytest -q
+"""
+import glob
+import importlib
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sensor_tools as st
+import supabase_stub
+
+di = importlib.import_module("data-import")
+
+RECORDING_ID = "0565b6af-c324-47da-b684-458970d6e48c"
+SESSION = (RECORDING_ID, "66001", "2025-12-11", "S1")
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    """
+    Stub server with 4 x 2000 sensor rows and 500 rows per response, and
+    data-import pointed at it and at an empty Data/ tree in tmp_path
+    """
+    server = supabase_stub.StubServer(supabase_stub.make_tables(RECORDING_ID, 2000), max_rows=500).start()
+    monkeypatch.setenv("VITE_SUPABASE_URL", server.url)
+    monkeypatch.setenv("VITE_SUPABASE_PUBLISHABLE_KEY", supabase_stub.FAKE_KEY)
+    monkeypatch.setattr(di, "_client", None)
+    monkeypatch.setattr(di, "data_path", f"{tmp_path}/Data/")
+    monkeypatch.setattr(di, "watermark_db", f"{tmp_path}/import_cache.sqlite")
+    monkeypatch.setattr(di, "BACKOFF_S", 0.01)
+    yield server
+    server.stop()
+
+
+def set_rows(server, n_rows):
+    server.tables = supabase_stub.make_tables(RECORDING_ID, n_rows)
+    server._cache.clear()
+
+
+def assert_session_matches(server):
+    # Every row on the server is in the CSVs and the bundle exactly once
+    session_dir, paths = di._session_paths(*SESSION[1:])
+    bundle = st.load_bundle(session_dir)
+    for name, type_id in di.SENSOR_TYPE_IDS.items():
+        n_server = sum(row["sensor_type_id"] == type_id for row in server.tables["sensor_data"])
+        assert len(pd.read_csv(paths[name])) == n_server, name
+        assert len(bundle[di.SENSOR_OUTPUTS[name][0]]) == n_server, name
+    assert len(pd.read_csv(paths["events"])) == len(server.tables["events"])
+
+
+def test_help_skips_heavy_imports():
+    out = subprocess.run([sys.executable, "-X", "importtime", "data-import.py", "--help"],
+                         cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True).stderr
+    loaded = {line.split("|")[-1].strip() for line in out.splitlines() if line.startswith("import time:")}
+    heavy = {"numpy", "pandas", "matplotlib", "supabase", "httpx", "scipy"}
+    assert not loaded & heavy, f"data-import.py --help imports {sorted(loaded & heavy)}"
+
+
+def test_single_query_is_capped(stub):
+    rows = di.get_client().table("sensor_data").select("*").eq("recording_id", RECORDING_ID).execute().data
+    assert len(rows) == stub.max_rows
+
+
+def test_pages_past_the_row_cap(stub):
+    fetched = di.fetch_recording(RECORDING_ID)
+    for name, type_id in di.SENSOR_TYPE_IDS.items():
+        timestamps = [row["timestamp"] for row in stub.tables["sensor_data"] if row["sensor_type_id"] == type_id]
+        assert [row["timestamp"] for row in fetched[name]] == sorted(timestamps), name
+    assert len(fetched["events"]) == len(stub.tables["events"])
+
+
+def test_pages_by_keyset(stub, monkeypatch):
+    # Every page after the first asks for the rows after the last one, never
+    # for an offset
+    params = []
+    query = stub.query
+    monkeypatch.setattr(stub, "query", lambda table, p: params.append(dict(p)) or query(table, p))
+    rows = di.fetch_sensor_data(RECORDING_ID, "accelerometer", page_size=300)
+    assert len(rows) == 2000 and len(params) == 2000 // 300 + 2
+    assert not any("offset" in p for p in params)
+    assert ["or" in p for p in params] == [False] + [True] * (len(params) - 1)
+
+
+def test_pages_synthetic_table(stub):
+    stub.tables = {"sensor_data": supabase_stub.SyntheticSensorData(RECORDING_ID, 1234), "events": []}
+    k = list(di.SENSOR_TYPE_IDS).index("gyroscope")
+    expected = [stub.tables["sensor_data"].row(k, i) for i in range(1234)]
+    rows = di.fetch_sensor_data(RECORDING_ID, "gyroscope", page_size=100, columns="*")
+    assert rows == expected
+    since = expected[600]["timestamp"]
+    assert di.fetch_sensor_data(RECORDING_ID, "gyroscope", since=since, columns="*") == expected[600:]
+
+
+def test_pages_with_tied_timestamps(stub):
+    # Whole-second timestamps: ~10 rows per tie, returned in a new order
+    # by every request
+    for row in stub.tables["sensor_data"]:
+        row["timestamp"] = supabase_stub._iso(int(supabase_stub._parse_ts(row["timestamp"]).timestamp()))
+    stub.shuffle_ties = True
+    rows = di.fetch_sensor_data(RECORDING_ID, "gyroscope", page_size=100, columns="*")
+    ids = [row["id"] for row in stub.tables["sensor_data"] if row["sensor_type_id"] == di.SENSOR_TYPE_IDS["gyroscope"]]
+    assert sorted(row["id"] for row in rows) == sorted(ids)
+
+
+def test_incremental_import(stub):
+    assert sum(di.import_recording(*SESSION).values()) == 4 * 2000 + 20
+    n_requests = stub.n_requests
+    assert sum(di.import_recording(*SESSION).values()) == 0
+    assert stub.n_requests - n_requests == 10
+
+    set_rows(stub, 2300)
+    assert sum(di.import_recording(*SESSION).values()) == 4 * 300
+    assert_session_matches(stub)
+
+
+def test_late_row_with_the_last_timestamp(stub):
+    di.import_recording(*SESSION)
+    stub.tables["sensor_data"].append(dict(stub.tables["sensor_data"][-1], id=10**9))
+    stub._cache.clear()
+    assert di.import_recording(*SESSION)["relative_orientation"] == 1
+    assert_session_matches(stub)
+
+
+@pytest.mark.parametrize("owner, attr, n_ok", [
+    (di, "_commit_part", 1),
+    (st.BundleWriter, "close", 0),
+    (di, "write_watermark", 0),
+    (di, "write_watermark", 2),
+])
+def test_interrupted_commit_is_not_repeated(stub, monkeypatch, owner, attr, n_ok):
+    di.import_recording(*SESSION)
+    set_rows(stub, 2300)
+    original = getattr(owner, attr)
+    calls = []
+
+    def crash(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > n_ok:
+            raise RuntimeError("crash")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(owner, attr, crash)
+    with pytest.raises(RuntimeError):
+        di.import_recording(*SESSION)
+    monkeypatch.setattr(owner, attr, original)
+    di.import_recording(*SESSION)
+    assert_session_matches(stub)
+
+
+@pytest.mark.parametrize("fail_status", [503, None])
+def test_retries_transient_errors(stub, fail_status):
+    # None: the connection is dropped without a response
+    stub.fail_rate, stub.fail_status = 0.1, fail_status
+    counts = di.import_recording(*SESSION)
+    assert stub.n_failed > 0
+    assert sum(counts.values()) == len(stub.tables["sensor_data"]) + len(stub.tables["events"])
+
+
+def test_resume_after_outage(stub, monkeypatch):
+    set_rows(stub, 20_000)
+    monkeypatch.setattr(di, "RETRIES", 2)
+    stub.fail_from = 100
+    with pytest.raises(Exception):
+        di.import_recording(*SESSION)
+    session_dir, _ = di._session_paths(*SESSION[1:])
+    n_pages = len(glob.glob(f"{session_dir}/.checkpoints/*/page_*.json"))
+    assert n_pages > 0
+
+    stub.fail_from = None
+    n_requests = stub.n_requests
+    counts = di.import_recording(*SESSION)
+    assert sum(counts.values()) == len(stub.tables["sensor_data"]) + len(stub.tables["events"])
+    # A fresh import makes one request per page plus an empty one per stream
+    n_fresh = len(stub.tables["sensor_data"]) // stub.max_rows + 4 + 2
+    assert stub.n_requests - n_requests == n_fresh - n_pages
+    assert not os.path.exists(f"{session_dir}/.checkpoints")
+
+
+def test_resume_skips_half_written_page(stub, monkeypatch):
+    # A run killed while a page was being written leaves page_NNNNNN.json.tmp
+    monkeypatch.setattr(di, "RETRIES", 2)
+    stub.fail_from = 10
+    with pytest.raises(Exception):
+        di.import_recording(*SESSION)
+    session_dir, _ = di._session_paths(*SESSION[1:])
+    checkpoint = sorted(glob.glob(f"{session_dir}/.checkpoints/*/"))[0]
+    with open(f"{checkpoint}page_999999.json.tmp", "w") as f:
+        f.write('[{"id": 1, "timest')
+
+    stub.fail_from = None
+    counts = di.import_recording(*SESSION)
+    assert sum(counts.values()) == len(stub.tables["sensor_data"]) + len(stub.tables["events"])
+
+
+def test_projected_rows_without_data_are_dropped():
+    # data->x of a row with null data is null, as are y and z
+    whole = [{"timestamp": "t0", "data": {"x": 1, "y": 2, "z": 3}}, {"timestamp": "t1", "data": None}]
+    projected = [{"id": 1, "timestamp": "t0", "x": 1, "y": 2, "z": 3}, {"id": 2, "timestamp": "t1", "x": None, "y": None, "z": None}]
+    pd.testing.assert_frame_equal(di.parse_signals_to_dataframe(projected), di.parse_signals_to_dataframe(whole))
+    assert len(di.parse_signals_to_dataframe(projected)) == 1
+
+
+def test_nulls_read_as_nan_and_missing_keys_as_zero():
+    rows = [{"timestamp": "t0", "data": {"x": None, "y": 2}}, {"timestamp": "t1", "data": '{"x": 1, "y": null, "z": 3}'}]
+    df = di.parse_signals_to_dataframe(rows)
+    np.testing.assert_array_equal(df[["x", "y", "z"]].to_numpy(), [[np.nan, 2, 0], [1, np.nan, 3]])
+    # The projection returns null for a missing key too
+    projected = [{"id": 1, "timestamp": "t0", "x": None, "y": 2, "z": None}]
+    assert di.parse_signals_to_dataframe(projected)[["x", "y", "z"]].isna().to_numpy().tolist() == [[True, False, True]]
@@ -0,0 +1,156 @@
+"""
+Checks of sensor_tools.py: the session bundle, the aligned grid and the
+event windows cut from it. The timing side is in runBenchmarks.py.
+
+    python -m pytest -q
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sensor_tools as st
+
+T0 = 1765466982.0
+
+
+def grid_df(n=600, f_s=10):
+    # A frame as from resample_streams: sample numbers as values on a 10 Hz
+    # grid from T0
+    df = pd.DataFrame({"time_s": np.arange(n) / f_s, "a": np.arange(n, dtype=np.float64), "b": -np.arange(n, dtype=np.float64)})
+    df.attrs["t0_epoch_s"] = T0
+    return df
+
+
+def sensor_frame(sensor, n, start=0):
+    # Sensor rows as data-import.py writes them: channels and ISO timestamps
+    rng = np.random.default_rng([n, start])
+    df = pd.DataFrame(rng.normal(size=(n, len(st.SENSOR_COLUMNS[sensor]))), columns=st.SENSOR_COLUMNS[sensor])
+    df["timestamp"] = pd.date_range(pd.Timestamp(T0, unit="s", tz="UTC") + pd.Timedelta(milliseconds=10 * start),
+                                    periods=n, freq="10ms").strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+    return df
+
+
+def assert_bundle(session_dir, frames):
+    # The bundle holds exactly the records of frames (sensor -> DataFrame)
+    bundle = st.load_bundle(session_dir)
+    assert sorted(bundle) == sorted(frames)
+    assert st.bundle_rows(session_dir) == {sensor: len(df) for sensor, df in frames.items()}
+    for sensor, df in frames.items():
+        expected = pd.DataFrame(st.sensor_records(df, sensor))
+        pd.testing.assert_frame_equal(bundle[sensor], expected, check_exact=True)
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    os.makedirs(tmp_path / "sensor-data")
+    return str(tmp_path)
+
+
+def test_bundle_round_trip_page_by_page(session_dir):
+    frames = {"accel": sensor_frame("accel", 2500), "relative_orientation": sensor_frame("relative_orientation", 700)}
+    with st.BundleWriter(session_dir) as bundle:
+        for sensor, df in frames.items():
+            for i in range(0, len(df), 1000):
+                bundle.write(sensor, st.sensor_records(df.iloc[i:i + 1000], sensor))
+    assert_bundle(session_dir, frames)
+    assert not glob.glob(f"{session_dir}/sensor-data/*.raw")
+
+
+def test_bundle_from_csv_matches_the_csvs(session_dir):
+    frames = {sensor: sensor_frame(sensor, 300 + 10 * k) for k, sensor in enumerate(st.SENSOR_COLUMNS)}
+    for sensor, df in frames.items():
+        df.to_csv(f"{session_dir}/sensor-data/{sensor}_signal_data.csv", index=False)
+    st.bundle_from_csv(session_dir, chunksize=128)
+    assert_bundle(session_dir, frames)
+    for sensor, (t, values) in st.load_session(session_dir).items():
+        np.testing.assert_array_equal(values, frames[sensor][st.SENSOR_COLUMNS[sensor]].to_numpy(dtype=np.float32))
+        np.testing.assert_allclose(t, st.to_epoch_s(frames[sensor]["timestamp"]), rtol=0, atol=1e-6)
+
+
+def test_bundle_appends_replaces_and_keeps(session_dir):
+    old = {"accel": sensor_frame("accel", 100), "gyro": sensor_frame("gyro", 100), "linear": sensor_frame("linear", 10)}
+    st.write_bundle(session_dir, {sensor: st.sensor_records(df, sensor) for sensor, df in old.items()})
+    new = {"accel": sensor_frame("accel", 50, start=100), "gyro": sensor_frame("gyro", 30)}
+    st.write_bundle(session_dir, {sensor: st.sensor_records(df, sensor) for sensor, df in new.items()}, append=["accel"])
+    assert_bundle(session_dir, {"accel": pd.concat([old["accel"], new["accel"]]), "gyro": new["gyro"], "linear": old["linear"]})
+
+
+def test_aborted_bundle_leaves_the_old_one(session_dir):
+    old = {"accel": sensor_frame("accel", 100)}
+    st.write_bundle(session_dir, {"accel": st.sensor_records(old["accel"], "accel")})
+    with pytest.raises(RuntimeError):
+        with st.BundleWriter(session_dir, append=["accel"]) as bundle:
+            bundle.write("accel", st.sensor_records(sensor_frame("accel", 50, start=100), "accel"))
+            bundle.write("gyro", st.sensor_records(sensor_frame("gyro", 50), "gyro"))
+            raise RuntimeError("crash")
+    assert_bundle(session_dir, old)
+    assert not glob.glob(f"{session_dir}/sensor-data/*.raw")
+
+
+def test_append_without_a_bundle_rebuilds_from_csv(session_dir):
+    # Only the new rows are written, the CSV already has all of them
+    df = sensor_frame("accel", 400)
+    df.to_csv(f"{session_dir}/sensor-data/accel_signal_data.csv", index=False)
+    with st.BundleWriter(session_dir, append=["accel"]) as bundle:
+        bundle.write("accel", st.sensor_records(df.iloc[300:], "accel"))
+    assert_bundle(session_dir, {"accel": df})
+
+
+def z_rotation(theta):
+    # Unit quaternions (w, x, y, z) of rotations by theta about z
+    theta = np.asarray(theta, dtype=np.float64)
+    return np.stack([np.cos(theta / 2), 0 * theta, 0 * theta, np.sin(theta / 2)], axis=-1)
+
+
+def test_resample_interpolates_on_the_overlap_and_masks_gaps():
+    # accel: linear in time with a 3 s gap, whose first sample is on the
+    # grid and keeps its value; gyro spans a shorter time
+    t = T0 + np.array([0, 1, 2, 3, 6, 7, 8.0])
+    streams = {"accel": (t, np.repeat((t - T0)[:, None], 3, axis=1)),
+               "gyro": (T0 + np.array([0.5, 7.5]), np.zeros((2, 3)))}
+    df = st.resample_streams(streams, f_s=10, max_gap_s=1.0)
+    assert df.attrs["t0_epoch_s"] == T0 + 0.5
+    assert len(df) == 71 and df["time_s"].iloc[-1] == pytest.approx(7.0)
+    in_gap = (df["time_s"] > 2.5) & (df["time_s"] < 5.5)
+    assert df.loc[in_gap, ["accel_x", "accel_y", "accel_z"]].isna().all().all()
+    np.testing.assert_allclose(df.loc[~in_gap, "accel_x"], df.loc[~in_gap, "time_s"] + 0.5, atol=1e-9)
+
+
+def test_resample_slerps_quaternions():
+    # A quarter turn about z between two samples, the second one stored with
+    # the opposite sign (the same rotation)
+    t = T0 + np.array([0, 1.0])
+    q = z_rotation([0, np.pi / 2]) * np.array([[1], [-1]])
+    df = st.resample_streams({"relative_orientation": (t, q)}, f_s=4)
+    quats = df[["relative_orientation_q0", "relative_orientation_q1", "relative_orientation_q2", "relative_orientation_q3"]]
+    np.testing.assert_allclose(quats.to_numpy(), z_rotation(np.pi / 2 * df["time_s"].to_numpy()), atol=1e-12)
+
+
+def test_event_windows_start_at_the_first_grid_row_in_range():
+    events = pd.DataFrame({"e_id": ["on", "off"], "epoch_s": [T0 + 5.0, T0 + 10.04]})
+    X, labels = st.event_windows(grid_df(), events, f_s=10, pre_s=1.0, post_s=2.0)
+    assert X.shape == (2, 31, 2)
+    assert labels["i0"].tolist() == [40, 91]
+    np.testing.assert_array_equal(X[1, :, 0], np.arange(91, 122))
+    np.testing.assert_array_equal(X[1, :, 1], -np.arange(91, 122))
+    assert labels["complete"].all()
+
+
+def test_event_windows_drop_events_off_the_grid_and_flag_gaps():
+    df = grid_df()
+    df.loc[300, "a"] = np.nan
+    events = pd.DataFrame({"e_id": ["early", "gap", "late"], "epoch_s": [T0 + 0.5, T0 + 30.0, T0 + 59.5]})
+    X, labels = st.event_windows(df, events, f_s=10, columns=["a"])
+    assert labels["e_id"].tolist() == ["gap"]
+    assert X.shape == (1, 21, 1)
+    assert not labels["complete"].iloc[0]
+
+
+def test_event_windows_need_the_grid_start():
+    df = grid_df()
+    df.attrs.clear()
+    with pytest.raises(KeyError):
+        st.event_windows(df, pd.DataFrame({"epoch_s": [T0 + 5.0]}), f_s=10)
@@ -0,0 +1,132 @@
+"""
+Checks of signal_generation_tools.py: the fast paths give the same
+results as the reference implementations they replace. The timing side
+is in runBenchmarks.py.
+
+    python -m pytest -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import signal_generation_tools as sgt
+
+# Welch on 5 s windows at 20 Hz: shorter than its default segment
+pytestmark = pytest.mark.filterwarnings("ignore:nperseg")
+
+f_0 = 20
+mu_std = [[0.5, 0.1], [0.0, 0.15], [3.0, 0.2], [0.0, 0.05]]
+ar_params = [
+    sgt.ar_from_timescale(8, f_0, 5),
+    sgt.ar_from_timescale(3, f_0, 3),
+    sgt.ar_from_timescale(4, f_0, 4),
+    sgt.ar_from_timescale(2, f_0, 6),
+]
+
+event_defs = {
+    "eID_1": {"criteria": sgt.event_criteria_mean, "sigs": ["sig_1"], "params": {"thresh": 0.5, "mode": "gt"}},
+    "eID_2": {"criteria": sgt.event_criteria_std, "sigs": ["sig_2"], "params": {"thresh": 0.15}},
+    "eID_3": {"criteria": sgt.event_criteria_fft_band, "sigs": ["sig_4"], "params": {"f_0": f_0, "band": (0.1, 0.4), "thresh": 0.01}},
+    "eID_4": {"criteria": sgt.event_criteria_peaks, "sigs": ["sig_3"], "params": {"min_peaks": 3}},
+    "eID_5": {"criteria": sgt.event_criteria_mean, "sigs": ["sig_1"], "params": {"thresh": 0.5, "mode": "lt"}},
+}
+
+
+@pytest.fixture(scope="module")
+def sigs_X_df():
+    return sgt.generate_signals_Ap(4, f_0, 900, mu_std, ar_params)
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 4321, 18_000, 100_000])
+def test_chunks_match_one_shot(sigs_X_df, chunk_size):
+    chunks = sgt.generate_signals_Ap_chunks(4, f_0, 900, mu_std, ar_params, chunk_size=chunk_size)
+    pd.testing.assert_frame_equal(pd.concat(list(chunks)), sigs_X_df, check_exact=True)
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 4321, 100_000])
+def test_event_chunks_match_one_shot(sigs_X_df, chunk_size):
+    chunks = (sigs_X_df.iloc[i:i + chunk_size] for i in range(0, len(sigs_X_df), chunk_size))
+    events = pd.concat(list(sgt.generate_events_chunks(chunks, f_0, 5, 3, event_defs)), ignore_index=True)
+    pd.testing.assert_frame_equal(events, sgt.generate_events(sigs_X_df, f_0, 5, 3, event_defs))
+
+
+@pytest.mark.parametrize("window_s, hop_len_s", [(5, 3), (5, 0.05), (5, 8)])
+def test_strided_events_match_loop(sigs_X_df, window_s, hop_len_s):
+    sigs = sigs_X_df.iloc[:6000]
+    strided = sgt.generate_events(sigs, f_0, window_s, hop_len_s, event_defs, method="strided")
+    loop = sgt.generate_events(sigs, f_0, window_s, hop_len_s, event_defs, method="loop")
+    assert len(loop)
+    pd.testing.assert_frame_equal(strided, loop)
+
+
+@pytest.mark.parametrize("eID", list(event_defs))
+def test_batched_criteria_match_one_window_at_a_time(sigs_X_df, eID):
+    edef = event_defs[eID]
+    windows = sgt._windows(sigs_X_df[edef["sigs"][0]].to_numpy(), 5 * f_0, 3 * f_0)
+    one_by_one = [bool(edef["criteria"](w, **edef["params"])) for w in windows]
+    np.testing.assert_array_equal(edef["criteria"](windows, **edef["params"]), one_by_one)
+
+
+def test_plain_criteria_go_through_per_window(sigs_X_df):
+    # Per-window functions as written before the batched protocol, one of
+    # them over two signals
+    def criteria_range(sig, spread):
+        return sig.max() - sig.min() > spread
+
+    def criteria_corr(sig_a, sig_b, r):
+        return np.corrcoef(sig_a, sig_b)[0, 1] > r
+
+    plain_defs = {
+        "wide": {"criteria": criteria_range, "sigs": ["sig_2"], "params": {"spread": 0.5}},
+        "together": {"criteria": criteria_corr, "sigs": ["sig_1", "sig_3"], "params": {"r": 0.3}},
+    }
+    sigs = sigs_X_df.iloc[:6000]
+    strided = sgt.generate_events(sigs, f_0, 5, 3, plain_defs, method="strided")
+    assert set(strided.eID) == {"wide", "together"}
+    pd.testing.assert_frame_equal(strided, sgt.generate_events(sigs, f_0, 5, 3, plain_defs, method="loop"))
+
+    adapted = sgt.per_window(criteria_range)
+    assert adapted.batched and adapted.__name__ == "criteria_range"
+
+
+@pytest.mark.parametrize("window_s, hop_len_s", [(5, 3), (60, 0.05), (5, 8)])
+def test_running_criteria_match_plain(sigs_X_df, window_s, hop_len_s):
+    pairs = [
+        (sgt.event_criteria_mean, sgt.event_criteria_running_mean, "sig_1", {"thresh": 0.5, "mode": "gt"}),
+        (sgt.event_criteria_std, sgt.event_criteria_running_std, "sig_2", {"thresh": 0.15}),
+    ]
+    plain_defs = {plain.__name__: {"criteria": plain, "sigs": [s], "params": params} for plain, _, s, params in pairs}
+    running_defs = {plain.__name__: {"criteria": run, "sigs": [s], "params": params} for plain, run, s, params in pairs}
+    plain = sgt.generate_events(sigs_X_df, f_0, window_s, hop_len_s, plain_defs)
+    assert set(plain.eID) == set(plain_defs)
+    pd.testing.assert_frame_equal(sgt.generate_events(sigs_X_df, f_0, window_s, hop_len_s, running_defs), plain)
+
+
+def test_running_crossings_match_full_count(sigs_X_df):
+    windows = sgt._windows(sigs_X_df["sig_3"].to_numpy(), 5 * f_0, 1)
+    above = windows > 3.0
+    full = np.sum(above[:, 1:] != above[:, :-1], axis=-1) >= 4
+    np.testing.assert_array_equal(sgt.event_criteria_running_crossings(windows, 3.0, 4, hop=1), full)
+
+
+@pytest.mark.parametrize("window_s, hop_len_s", [(5, 3), (5, 8)])
+@pytest.mark.parametrize("batch", [1, 3, 1000])
+def test_online_detector_matches_generate_events(sigs_X_df, window_s, hop_len_s, batch):
+    online_defs = {
+        **event_defs,
+        "eID_6": {"criteria": sgt.event_criteria_running_std, "sigs": ["sig_2"], "params": {"thresh": 0.15}},
+        "eID_7": {"criteria": sgt.event_criteria_running_mean, "sigs": ["sig_1"], "params": {"thresh": 0.5}},
+    }
+    sigs = sigs_X_df.iloc[:6000]
+    detector = sgt.OnlineEventDetector(f_0, window_s, hop_len_s, online_defs)
+    events = []
+    for i in range(0, len(sigs), batch):
+        events += detector.push(sigs.iloc[i:i + batch])
+    expected = sgt.generate_events(sigs, f_0, window_s, hop_len_s, online_defs)
+    assert len(expected)
+    pd.testing.assert_frame_equal(pd.DataFrame(events, columns=["time_t", "eID"]), expected)
+
+
+def test_online_detector_rejects_hop_under_one_sample():
+    with pytest.raises(ValueError):
+        sgt.OnlineEventDetector(f_0, 5, 0.01, event_defs)